@@ -6,6 +6,7 @@ Phase 1-2: Basic WebSocket Connection and Echo Server
 """
 
 import os
+import signal
 from app import create_app, socketio
 
 # Get environment from environment variable
@@ -30,9 +31,17 @@ if __name__ == '__main__':
     print(f"API Endpoints: http://{host}:{port}/api")
     print(f"WebSocket: ws://{host}:{port}")
     print("=" * 60)
-    print("Press CTRL+C to quit")
+    print("Press CTRL+C to quit, send SIGTERM to drain gracefully")
     print()
 
+    # SIGTERM drains connected clients in waves, then stops the server
+    def handle_sigterm(signum, frame):
+        from app.events.socket_events import connected_clients
+        from app.services.drain_service import start_drain
+        start_drain(app, socketio, connected_clients, on_complete=socketio.stop)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
     # Run the application with SocketIO
     socketio.run(
         app,
@@ -40,6 +40,8 @@ def create_app(config_name=None):
         async_mode=app.config['SOCKETIO_ASYNC_MODE'],
         ping_timeout=app.config['SOCKETIO_PING_TIMEOUT'],
         ping_interval=app.config['SOCKETIO_PING_INTERVAL'],
+        http_compression=app.config['SOCKETIO_HTTP_COMPRESSION'],
+        compression_threshold=app.config['SOCKETIO_COMPRESSION_THRESHOLD'],
         logger=app.config['DEBUG'],
         engineio_logger=app.config['DEBUG']
     )
@@ -48,19 +50,51 @@ def create_app(config_name=None):
     from app.utils.logger import setup_logging
     setup_logging(app)
 
+    # Configure WebSocket and HTTP compression
+    from app.services.compression_service import init_compression
+    init_compression(app, socketio)
+
+    # Load outbound coalescing settings
+    from app.services.coalesce_service import init_coalescing
+    init_coalescing(app)
+
+    # Record baseline memory usage
+    from app.services.memory_service import init_memory
+    init_memory(app)
+
     # Initialize database
     from app.services.db_service import init_db
     with app.app_context():
         init_db(app)
 
+        # Build the username prefix index
+        from app.services.user_directory import load_directory
+        load_directory(app)
+
+    # Select the message storage engine
+    from app.services.message_store import init_message_store
+    init_message_store(app, socketio)
+
+    # Expire abandoned uploads
+    from app.services.attachment_service import init_attachments
+    init_attachments(app, socketio)
+
     # Register blueprints
     from app.routes.api import api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
 
+    from app.routes.attachments import attachments_bp
+    app.register_blueprint(attachments_bp, url_prefix='/api/attachments')
+
     # Register SocketIO event handlers
     from app.events import socket_events
     socket_events.register_handlers(socketio)
 
+    # Record inbound traffic for replay if configured
+    if app.config['TRAFFIC_RECORD_PATH']:
+        from app.services.traffic_recorder import start_recording
+        start_recording(app.config['TRAFFIC_RECORD_PATH'], socketio)
+
     # Log startup information
     app.logger.info(f"Flask-SocketIO Chat Server initialized")
     app.logger.info(f"Environment: {config_name or 'development'}")
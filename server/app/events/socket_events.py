@@ -5,18 +5,170 @@ Handles WebSocket events for chat functionality
 Phase 1-2: Basic WebSocket Connection and Echo Server
 """
 
-from flask import request
-from flask_socketio import emit, join_room, leave_room
+from flask import request, current_app
+from flask_socketio import ConnectionRefusedError, emit, join_room, leave_room, rooms
 from datetime import datetime
+from functools import wraps
+from app.models.attachment import Attachment
+from app.models.message import Message
+from app.models.user import User
+from app.services.attachment_service import to_reference
+from app.services.compression_service import discard_connection_stats, get_connection_stats
+from app.services.profiler_service import profiled
+from app.services import coalesce_service, drain_service, presence_service, typing_service, user_directory
+from app.services.traffic_recorder import record, stop_recording
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Store connected clients (in-memory for Phase 1-2)
-# Structure: {session_id: {'socket_id': str, 'connected_at': datetime}}
+# Structure: {session_id: {'socket_id': str, 'eio_sid': str, 'user_id': int or None,
+#                           'connected_at': datetime}}
 connected_clients = {}
 
 
+def validate_message(data):
+    """
+    Validate an inbound chat message (must run in an event handler)
+
+    Args:
+        data: Message data (expected to be dict with 'content' key, optional
+              'attachment_id' of a completed upload and optional
+              'conversation_id' of a joined conversation)
+
+    Returns:
+        Tuple (message, error): message is a dict with 'content', the
+        'conversation_id' if given and, for attachments, a small 'attachment'
+        reference; error is None or a dict with 'error' and 'message'
+    """
+    if not isinstance(data, dict):
+        return None, {
+            "error": "Invalid message format",
+            "message": "Message must be a JSON object",
+        }
+
+    content = data.get("content", "")
+    attachment_id = data.get("attachment_id")
+
+    if not content and not attachment_id:
+        return None, {
+            "error": "Empty message",
+            "message": "Message content cannot be empty",
+        }
+
+    message = {"content": content}
+
+    if "conversation_id" in data:
+        conversation_id = get_conversation_id(data)
+        if conversation_id is None or conversation_room(conversation_id) not in rooms():
+            return None, {
+                "error": "Invalid conversation",
+                "message": "Join the conversation before sending messages to it",
+            }
+        message["conversation_id"] = conversation_id
+
+    if attachment_id:
+        attachment = Attachment.get_attachment(str(attachment_id))
+        if attachment is None or attachment["status"] != Attachment.COMPLETE:
+            return None, {
+                "error": "Invalid attachment",
+                "message": "Attachment does not exist or is not fully uploaded",
+            }
+        message["attachment"] = to_reference(attachment)
+
+    return message, None
+
+
+def conversation_room(conversation_id):
+    """
+    Get the SocketIO room of a conversation
+
+    Namespaced so a conversation id can never name another client's private
+    (socket id) room.
+
+    Args:
+        conversation_id: Conversation ID
+
+    Returns:
+        Room name
+    """
+    return f"conversation:{conversation_id}"
+
+
+def get_conversation_id(data):
+    """
+    Extract a conversation id from event data
+
+    Args:
+        data: Event data (expected to be dict with 'conversation_id' key)
+
+    Returns:
+        Non-empty conversation id string, or None
+    """
+    conversation_id = data.get("conversation_id") if isinstance(data, dict) else None
+    if not isinstance(conversation_id, str) or not conversation_id:
+        return None
+    return conversation_id
+
+
+def store_messages(user_id, messages):
+    """
+    Persist messages sent to a conversation in one write and link their
+    attachments
+
+    Messages are stored under the sender's user ID; while a connection is not
+    linked to a user (user_id is None) nothing is stored, since socket ids mean
+    nothing after a reconnect. Messages without a conversation are only
+    echoed and not stored.
+
+    Args:
+        user_id: Sender's user ID, or None for an anonymous connection
+        messages: List of validated message dicts
+
+    Returns:
+        The messages, each with its stored 'id' when it was persisted
+    """
+    if user_id is None:
+        return messages
+
+    positions = [i for i, message in enumerate(messages) if "conversation_id" in message]
+    if not positions:
+        return messages
+
+    message_ids = Message.create_messages([
+        (messages[i]["conversation_id"], user_id, messages[i]["content"], None)
+        for i in positions
+    ])
+
+    stored = list(messages)
+    links = []
+    for i, message_id in zip(positions, message_ids):
+        message = stored[i] = {**messages[i], "id": message_id}
+        if "attachment" in message:
+            links.append((message["attachment"]["id"], message["conversation_id"], message_id))
+    if links:
+        Attachment.link_to_messages(links)
+    return stored
+
+
+def track_activity(handler):
+    """
+    Decorator recording client activity for presence tracking
+
+    Args:
+        handler: SocketIO event handler
+
+    Returns:
+        Wrapped handler
+    """
+    @wraps(handler)
+    def wrapper(*args):
+        presence_service.touch(request.sid)
+        return handler(*args)
+
+    return wrapper
+
+
 def register_handlers(socketio):
     """
     Register all SocketIO event handlers
@@ -25,15 +177,110 @@ def register_handlers(socketio):
         socketio: SocketIO instance
     """
 
-    @socketio.on("connect")
-    def handle_connect():
+    def on(event, activity=True):
+        """
+        Decorator registering a handler for an event, with traffic recording,
+        handler profiling and (unless activity is False) presence tracking
+
+        Args:
+            event: SocketIO event name
+            activity: Count the event as client activity for presence
+
+        Returns:
+            Decorator
+        """
+        def decorator(handler):
+            if activity:
+                handler = track_activity(handler)
+            return socketio.on(event)(record(event)(profiled(event)(handler)))
+
+        return decorator
+
+    def emit_typing(client_id, conversation_id, typing):
+        """Send a typing transition to the other participants of a conversation"""
+        coalesce_service.send_to_room(
+            socketio,
+            conversation_room(conversation_id),
+            "typing",
+            {"conversation_id": conversation_id, "client_id": client_id, "typing": typing},
+            skip_sid=client_id,
+        )
+
+    def on_typing_expired(expired):
+        """Announce typing stops for state expired by the sweeper"""
+        for client_id, conversation_id in expired:
+            emit_typing(client_id, conversation_id, False)
+
+    def reply(event, data):
+        """Send an event to the current client, coalescing if it opted in"""
+        coalesce_service.send(socketio, request.sid, event, data)
+
+    def make_presence_flush(app):
+        """Build the presence tick callback bound to the application"""
+
+        def on_presence_tick(transitions, user_ids):
+            # Each watcher gets one update with the transitions it subscribed to
+            timestamp = datetime.now().isoformat()
+            for watcher, updates in presence_service.route(transitions).items():
+                coalesce_service.send(
+                    socketio,
+                    watcher,
+                    "presence_update",
+                    {
+                        "updates": [
+                            {"client_id": client_id, "status": status}
+                            for client_id, status in updates
+                        ],
+                        "timestamp": timestamp,
+                    },
+                )
+            if user_ids:
+                with app.app_context():
+                    try:
+                        User.bulk_update_last_seen(user_ids)
+                    except Exception as e:
+                        logger.error(f"Failed to flush last_seen for {len(user_ids)} users: {str(e)}")
+
+        return on_presence_tick
+
+    def flush_pending(app):
+        """Flush buffered events, presence and recorded traffic before a drain"""
+        coalesce_service.flush_all(socketio)
+        transitions, user_ids = presence_service.tick()
+        if transitions or user_ids:
+            make_presence_flush(app)(transitions, user_ids)
+        stop_recording()
+
+    drain_service.register_flush_hook(flush_pending)
+
+    @on("connect", activity=False)
+    def handle_connect(auth=None):
         """
         Handle client connection (Phase 1)
         Triggered when a client establishes WebSocket connection
+
+        Args:
+            auth: Optional authentication data sent by the client
         """
         client_id = request.sid
+
+        # Refuse new connections while draining before a restart
+        if drain_service.is_draining():
+            raise ConnectionRefusedError("Server is draining, reconnect later")
+
+        app = current_app._get_current_object()
+        presence_service.start_ticker(socketio, app.config, make_presence_flush(app))
+        presence_service.register(client_id)
+
+        # Clients opt in to outbound coalescing with ?coalesce=1
+        if request.args.get("coalesce") in ("1", "true"):
+            coalesce_service.enable(client_id)
+
         connected_clients[client_id] = {
             "socket_id": client_id,
+            "eio_sid": socketio.server.manager.eio_sid_from_sid(client_id, "/"),
+            # Set once connections are authenticated to a user
+            "user_id": None,
             "connected_at": datetime.now(),
         }
 
@@ -51,19 +298,19 @@ def register_handlers(socketio):
             },
         )
 
-        # Broadcast to all other clients that someone joined
-        emit(
+        # Broadcast to all clients (this one included) that someone joined
+        coalesce_service.send_to_room(
+            socketio,
+            None,
             "client_joined",
             {
                 "client_id": client_id,
                 "total_clients": len(connected_clients),
                 "timestamp": datetime.now().isoformat(),
             },
-            broadcast=True,
-            include_self=True,
         )
 
-    @socketio.on("disconnect")
+    @on("disconnect", activity=False)
     def handle_disconnect():
         """
         Handle client disconnection
@@ -71,25 +318,38 @@ def register_handlers(socketio):
         """
         client_id = request.sid
 
+        presence_service.unregister(client_id)
+        coalesce_service.disable(client_id)
+        if client_id in connected_clients:
+            discard_connection_stats(connected_clients[client_id]["eio_sid"])
+
+        for conversation_id in typing_service.clear_client(client_id):
+            emit_typing(client_id, conversation_id, False)
+
         if client_id in connected_clients:
             del connected_clients[client_id]
             logger.info(f"Client disconnected: {client_id}")
             logger.debug(f"Remaining connected clients: {len(connected_clients)}")
 
+            # Every client is leaving during a drain; skip the N x N broadcasts
+            if drain_service.is_draining():
+                return
+
             # Broadcast to all clients that someone left
-            emit(
+            coalesce_service.send_to_room(
+                socketio,
+                None,
                 "client_left",
                 {
                     "client_id": client_id,
                     "total_clients": len(connected_clients),
                     "timestamp": datetime.now().isoformat(),
                 },
-                broadcast=True,
             )
         else:
             logger.warning(f"Disconnect from unknown client: {client_id}")
 
-    @socketio.on("echo")
+    @on("echo")
     def handle_echo(data):
         """
         Handle echo messages (Phase 2)
@@ -102,7 +362,7 @@ def register_handlers(socketio):
         logger.debug(f"Echo request from {client_id}: {data}")
 
         # Echo back to the sender
-        emit(
+        reply(
             "echo_response",
             {
                 "original_data": data,
@@ -111,55 +371,279 @@ def register_handlers(socketio):
             },
         )
 
-    @socketio.on("message")
+    @on("message")
     def handle_message(data):
         """
         Handle chat messages (Phase 2+)
-        Receives message and echoes it back for now
+        Stores messages sent to a conversation and echoes them back
         In future phases, this will broadcast to other clients
 
         Args:
-            data: Message data (expected to be dict with 'content' key)
+            data: Message data (expected to be dict with 'content' key and
+                  optional 'conversation_id')
         """
         client_id = request.sid
         logger.info(f"Message from {client_id}: {data}")
 
         # Validate message data
-        if not isinstance(data, dict):
-            emit(
+        message, error = validate_message(data)
+
+        if error:
+            reply("error", {**error, "timestamp": datetime.now().isoformat()})
+            return
+
+        try:
+            message = store_messages(connected_clients.get(client_id, {}).get("user_id"), [message])[0]
+        except Exception as e:
+            logger.error(f"Failed to store message from {client_id}: {str(e)}")
+            reply(
                 "error",
                 {
-                    "error": "Invalid message format",
-                    "message": "Message must be a JSON object",
+                    "error": "Storage error",
+                    "message": "Message could not be stored",
                     "timestamp": datetime.now().isoformat(),
                 },
             )
             return
 
-        content = data.get("content", "")
+        # Echo message back to sender (Phase 2 behavior)
+        reply(
+            "message_response",
+            {
+                **message,
+                "sender_id": client_id,
+                "timestamp": datetime.now().isoformat(),
+            },
+        )
+
+    @on("message_batch")
+    def handle_message_batch(data):
+        """
+        Handle a batch of chat messages
+        Validates every message, persists the accepted ones in one write and
+        answers with a single message_batch_response holding the accepted
+        messages and per-index errors
 
-        if not content:
+        Args:
+            data: List of message dicts, or dict with a 'messages' list
+        """
+        client_id = request.sid
+        messages = data.get("messages") if isinstance(data, dict) else data
+
+        if not isinstance(messages, list) or not messages:
+            reply(
+                "error",
+                {
+                    "error": "Invalid batch format",
+                    "message": "Batch must be a non-empty array of messages",
+                    "timestamp": datetime.now().isoformat(),
+                },
+            )
+            return
+
+        max_size = current_app.config["MESSAGE_BATCH_MAX_SIZE"]
+        if len(messages) > max_size:
+            reply(
+                "error",
+                {
+                    "error": "Batch too large",
+                    "message": f"Batch cannot contain more than {max_size} messages",
+                    "timestamp": datetime.now().isoformat(),
+                },
+            )
+            return
+
+        logger.info(f"Message batch from {client_id}: {len(messages)} messages")
+
+        timestamp = datetime.now().isoformat()
+        indexes = []
+        valid = []
+        errors = []
+        for index, message in enumerate(messages):
+            validated, error = validate_message(message)
+            if error:
+                errors.append({"index": index, **error})
+            else:
+                indexes.append(index)
+                valid.append(validated)
+
+        accepted = []
+        try:
+            valid = store_messages(connected_clients.get(client_id, {}).get("user_id"), valid)
+        except Exception as e:
+            logger.error(f"Failed to store message batch from {client_id}: {str(e)}")
+            errors.extend(
+                {"index": index, "error": "Storage error", "message": "Message could not be stored"}
+                for index in indexes
+            )
+            errors.sort(key=lambda error: error["index"])
+        else:
+            accepted = [
+                {"index": index, **message, "sender_id": client_id}
+                for index, message in zip(indexes, valid)
+            ]
+
+        # Echo accepted messages back to sender (Phase 2 behavior)
+        reply(
+            "message_batch_response",
+            {
+                "messages": accepted,
+                "errors": errors,
+                "timestamp": timestamp,
+            },
+        )
+
+    @on("join_conversation")
+    def handle_join_conversation(data):
+        """
+        Handle joining a conversation room
+        Participants of a conversation receive its typing indicators
+
+        Args:
+            data: Dict with 'conversation_id' key
+        """
+        client_id = request.sid
+        conversation_id = get_conversation_id(data)
+
+        if conversation_id is None:
             emit(
                 "error",
                 {
-                    "error": "Empty message",
-                    "message": "Message content cannot be empty",
+                    "error": "Invalid conversation",
+                    "message": "conversation_id must be a non-empty string",
                     "timestamp": datetime.now().isoformat(),
                 },
             )
             return
 
-        # Echo message back to sender (Phase 2 behavior)
+        join_room(conversation_room(conversation_id))
+        logger.debug(f"Client {client_id} joined conversation {conversation_id}")
+
         emit(
-            "message_response",
+            "conversation_joined",
+            {"conversation_id": conversation_id, "timestamp": datetime.now().isoformat()},
+        )
+
+    @on("leave_conversation")
+    def handle_leave_conversation(data):
+        """
+        Handle leaving a conversation room
+
+        Args:
+            data: Dict with 'conversation_id' key
+        """
+        client_id = request.sid
+        conversation_id = get_conversation_id(data)
+
+        if conversation_id is None:
+            return
+
+        if typing_service.set_typing(client_id, conversation_id, False, 0, 0) is False:
+            emit_typing(client_id, conversation_id, False)
+
+        leave_room(conversation_room(conversation_id))
+        logger.debug(f"Client {client_id} left conversation {conversation_id}")
+
+        emit(
+            "conversation_left",
+            {"conversation_id": conversation_id, "timestamp": datetime.now().isoformat()},
+        )
+
+    @on("typing")
+    def handle_typing(data):
+        """
+        Handle typing indicator signals (Phase 9)
+        Clients may send this on every keystroke; only start/stop transitions
+        are forwarded to the other conversation participants. Typing state is
+        never persisted or logged, and silent typists expire automatically.
+
+        Args:
+            data: Dict with 'conversation_id' and optional 'typing' (default True)
+        """
+        client_id = request.sid
+        conversation_id = get_conversation_id(data)
+
+        # Only participants may signal typing in a conversation
+        if conversation_id is None or conversation_room(conversation_id) not in rooms():
+            return
+
+        config = current_app.config
+        typing_service.start_sweeper(
+            socketio, config["TYPING_SWEEP_INTERVAL"], on_typing_expired
+        )
+
+        transition = typing_service.set_typing(
+            client_id,
+            conversation_id,
+            bool(data.get("typing", True)),
+            config["TYPING_TIMEOUT"],
+            config["TYPING_DEBOUNCE"],
+        )
+        if transition is not None:
+            emit_typing(client_id, conversation_id, transition)
+
+    @on("watch_presence")
+    def handle_watch_presence(data):
+        """
+        Handle presence subscriptions
+        Replaces the set of connections this client receives presence_update
+        events for and answers with their current status
+
+        Args:
+            data: Dict with 'client_ids' list (empty to stop watching)
+        """
+        client_ids = data.get("client_ids") if isinstance(data, dict) else None
+        max_watched = current_app.config["PRESENCE_MAX_WATCHED"]
+
+        if not isinstance(client_ids, list) or not all(isinstance(c, str) for c in client_ids) \
+                or len(client_ids) > max_watched:
+            reply(
+                "error",
+                {
+                    "error": "Invalid presence subscription",
+                    "message": f"client_ids must be a list of at most {max_watched} socket ids",
+                    "timestamp": datetime.now().isoformat(),
+                },
+            )
+            return
+
+        snapshot = presence_service.watch(request.sid, client_ids)
+        reply(
+            "presence_update",
             {
-                "content": content,
-                "sender_id": client_id,
+                "updates": [
+                    {"client_id": client_id, "status": status}
+                    for client_id, status in snapshot
+                ],
                 "timestamp": datetime.now().isoformat(),
             },
         )
 
-    @socketio.on("ping")
+    @on("search_users")
+    def handle_search_users(data):
+        """
+        Handle recipient autocomplete
+        Returns users whose username starts with the query
+
+        Args:
+            data: Dict with 'query' and optional 'limit'
+        """
+        if not isinstance(data, dict):
+            data = {}
+        query, limit = user_directory.parse_search(
+            data.get("query"), data.get("limit"), current_app.config["USER_SEARCH_MAX_RESULTS"]
+        )
+
+        reply(
+            "search_users_response",
+            {
+                "query": query,
+                "results": user_directory.search_users(query, limit),
+                "timestamp": datetime.now().isoformat(),
+            },
+        )
+
+    @on("ping")
     def handle_ping():
         """
         Handle ping requests for connection health check
@@ -171,7 +655,7 @@ def register_handlers(socketio):
 
         emit("pong", {"client_id": client_id, "timestamp": datetime.now().isoformat()})
 
-    @socketio.on("get_status")
+    @on("get_status")
     def handle_get_status():
         """
         Handle status request
@@ -189,6 +673,24 @@ def register_handlers(socketio):
             },
         )
 
+    @on("get_compression_stats")
+    def handle_get_compression_stats():
+        """
+        Handle compression statistics request
+        Returns byte counters before and after compression for this connection
+        """
+        client_id = request.sid
+        client = connected_clients.get(client_id, {})
+
+        emit(
+            "compression_stats_response",
+            {
+                "client_id": client_id,
+                "stats": get_connection_stats(client.get("eio_sid")),
+                "timestamp": datetime.now().isoformat(),
+            },
+        )
+
     @socketio.on_error_default
     def default_error_handler(e):
         """
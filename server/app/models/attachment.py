@@ -0,0 +1,171 @@
+"""
+Attachment Model
+Database model for file attachments uploaded in chunks and linked to messages
+"""
+
+from app.services.db_service import execute_query, get_db
+from datetime import datetime
+
+
+class Attachment:
+    """Attachment model for chunked file uploads"""
+
+    UPLOADING = 'uploading'
+    COMPLETE = 'complete'
+
+    @staticmethod
+    def create_attachment(attachment_id, filename, content_type, size):
+        """
+        Register a new upload
+
+        Args:
+            attachment_id: Unique attachment ID
+            filename: Original file name
+            content_type: MIME type declared by the client
+            size: Total size in bytes
+
+        Returns:
+            Attachment dict
+        """
+        query = """
+            INSERT INTO attachments (id, filename, content_type, size)
+            VALUES (?, ?, ?, ?)
+        """
+        execute_query(query, (attachment_id, filename, content_type, size))
+        return Attachment.get_attachment(attachment_id)
+
+    @staticmethod
+    def get_attachment(attachment_id):
+        """
+        Get attachment by ID
+
+        Args:
+            attachment_id: Attachment ID
+
+        Returns:
+            Attachment dict or None
+        """
+        query = "SELECT * FROM attachments WHERE id = ?"
+        return execute_query(query, (attachment_id,), fetch_one=True)
+
+    @staticmethod
+    def update_received(attachment_id, received):
+        """
+        Record how many bytes have been written so far
+
+        Args:
+            attachment_id: Attachment ID
+            received: Bytes received
+        """
+        query = "UPDATE attachments SET received = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
+        execute_query(query, (received, attachment_id))
+
+    @staticmethod
+    def count_uploading():
+        """
+        Count uploads still in progress
+
+        Returns:
+            Number of attachments with status 'uploading'
+        """
+        query = "SELECT COUNT(*) AS count FROM attachments WHERE status = ?"
+        return execute_query(query, (Attachment.UPLOADING,), fetch_one=True)['count']
+
+    @staticmethod
+    def get_stale_uploads(max_idle):
+        """
+        Get uploads that received no chunk for a while
+
+        Args:
+            max_idle: Seconds since the upload started or last received a chunk
+
+        Returns:
+            List of attachment dicts
+        """
+        query = """
+            SELECT * FROM attachments
+            WHERE status = ? AND COALESCE(updated_at, created_at) < datetime('now', ?)
+        """
+        return execute_query(query, (Attachment.UPLOADING, f'-{int(max_idle)} seconds'),
+                             fetch_all=True)
+
+    @staticmethod
+    def delete_attachment(attachment_id):
+        """
+        Delete an attachment row
+
+        Args:
+            attachment_id: Attachment ID
+        """
+        query = "DELETE FROM attachments WHERE id = ?"
+        execute_query(query, (attachment_id,))
+
+    @staticmethod
+    def mark_complete(attachment_id, sha256):
+        """
+        Mark an upload as complete
+
+        Args:
+            attachment_id: Attachment ID
+            sha256: Hex digest of the full file
+        """
+        query = """
+            UPDATE attachments
+            SET received = size, sha256 = ?, status = ?, completed_at = ?
+            WHERE id = ?
+        """
+        execute_query(query, (sha256, Attachment.COMPLETE, datetime.now(), attachment_id))
+
+    @staticmethod
+    def link_to_message(attachment_id, conversation_id, message_id):
+        """
+        Link an attachment to the first stored message that references it
+
+        Args:
+            attachment_id: Attachment ID
+            conversation_id: Conversation of the message
+            message_id: Message ID
+        """
+        query = """
+            UPDATE attachments SET conversation_id = ?, message_id = ?
+            WHERE id = ? AND message_id IS NULL
+        """
+        execute_query(query, (conversation_id, message_id, attachment_id))
+
+    @staticmethod
+    def link_to_messages(links):
+        """
+        Link several attachments to their messages in one transaction
+
+        Args:
+            links: List of (attachment_id, conversation_id, message_id) tuples
+        """
+        query = """
+            UPDATE attachments SET conversation_id = ?, message_id = ?
+            WHERE id = ? AND message_id IS NULL
+        """
+        db = get_db()
+        with db:
+            db.executemany(query, [
+                (conversation_id, message_id, attachment_id)
+                for attachment_id, conversation_id, message_id in links
+            ])
+
+    @staticmethod
+    def get_attachments_for_message(conversation_id, message_id):
+        """
+        Get all attachments of a message
+
+        Args:
+            conversation_id: Conversation of the message
+            message_id: Message ID
+
+        Returns:
+            List of attachment dicts
+        """
+        query = """
+            SELECT * FROM attachments
+            WHERE conversation_id = ? AND message_id = ?
+            ORDER BY created_at
+        """
+        return execute_query(query, (conversation_id, message_id), fetch_all=True)
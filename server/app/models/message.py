@@ -0,0 +1,85 @@
+"""
+Message Model
+Chat message persistence (Phase 5+)
+
+Messages are stored by the engine selected with MESSAGE_STORE_ENGINE (see
+app.services.message_store); this model is the engine-independent entry point.
+"""
+
+from app.services.message_store import get_message_store
+
+
+class Message:
+    """Message model backed by the configured storage engine"""
+
+    @staticmethod
+    def create_message(conversation_id, sender_id, content, recipient_id=None):
+        """
+        Store a message
+
+        Args:
+            conversation_id: Conversation the message belongs to
+            sender_id: Sender's user ID
+            content: Message text
+            recipient_id: Recipient's user ID for direct messages
+
+        Returns:
+            Message ID (increasing within the conversation)
+        """
+        return get_message_store().append(conversation_id, sender_id, content, recipient_id)
+
+    @staticmethod
+    def create_messages(messages):
+        """
+        Store a batch of messages in one write
+
+        Args:
+            messages: List of (conversation_id, sender_id, content, recipient_id) tuples
+
+        Returns:
+            List of message IDs, in the order of messages
+        """
+        return get_message_store().append_many(messages)
+
+    @staticmethod
+    def get_message(conversation_id, message_id):
+        """
+        Get a message by ID
+
+        Args:
+            conversation_id: Conversation ID
+            message_id: Message ID
+
+        Returns:
+            Message dict or None
+        """
+        return get_message_store().get_message(conversation_id, message_id)
+
+    @staticmethod
+    def get_history(conversation_id, before=None, limit=50):
+        """
+        Get a page of conversation history, newest first
+
+        Args:
+            conversation_id: Conversation ID
+            before: Only return messages older than this message ID
+            limit: Maximum number of messages
+
+        Returns:
+            List of message dicts
+        """
+        return get_message_store().get_history(conversation_id, before, limit)
+
+    @staticmethod
+    def delete_message(conversation_id, message_id):
+        """
+        Delete a message
+
+        Args:
+            conversation_id: Conversation ID
+            message_id: Message ID
+
+        Returns:
+            True if the message existed
+        """
+        return get_message_store().delete(conversation_id, message_id)
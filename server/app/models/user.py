@@ -9,7 +9,8 @@ This module will be expanded in future phases to include:
 - Online status tracking
 """
 
-from app.services.db_service import execute_query
+from app.services.db_service import execute_query, get_db
+from app.services import user_directory
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
@@ -38,11 +39,13 @@ class User:
 
         try:
             user_id = execute_query(query, (username, password_hash))
-            return user_id
         except Exception as e:
             # Handle duplicate username or other errors
             return None
 
+        user_directory.add_user(user_id, username)
+        return user_id
+
     @staticmethod
     def get_user_by_username(username):
         """
@@ -100,3 +103,28 @@ class User:
         """
         query = "UPDATE users SET last_seen = ? WHERE id = ?"
         execute_query(query, (datetime.now(), user_id))
+
+    @staticmethod
+    def bulk_update_last_seen(user_ids, seen_at=None):
+        """
+        Update last seen timestamp for many users at once
+
+        Issues one UPDATE per chunk of ids instead of one per user, all in a
+        single transaction.
+
+        Args:
+            user_ids: Iterable of user IDs
+            seen_at: Timestamp to store (defaults to now)
+        """
+        user_ids = list(user_ids)
+        seen_at = seen_at or datetime.now()
+
+        # Stay below SQLite's default limit of 999 bound parameters
+        chunk_size = 900
+        db = get_db()
+        with db:
+            for start in range(0, len(user_ids), chunk_size):
+                chunk = user_ids[start:start + chunk_size]
+                placeholders = ", ".join("?" * len(chunk))
+                query = f"UPDATE users SET last_seen = ? WHERE id IN ({placeholders})"
+                db.execute(query, (seen_at, *chunk))
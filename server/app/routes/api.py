@@ -3,9 +3,14 @@ REST API Routes
 HTTP endpoints for server status and health checks
 """
 
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, Response, jsonify, current_app, request
 from datetime import datetime
+from app import socketio
 from app.events.socket_events import connected_clients
+from app.services.compression_service import get_connection_stats, get_polling_stats
+from app.services.presence_service import get_status as get_presence_status
+from app.services import drain_service, memory_service, profiler_service, user_directory
+from app.utils.auth import admin_required
 
 # Create Blueprint
 api_bp = Blueprint('api', __name__)
@@ -15,13 +20,24 @@ api_bp = Blueprint('api', __name__)
 def health_check():
     """
     Health check endpoint
-    Returns server status and basic information
+    Returns server status and basic information; reports not-ready (503)
+    while the server is draining so load balancers stop routing to it
 
     Returns:
         JSON response with server health status
     """
+    if drain_service.is_draining():
+        return jsonify({
+            'status': 'draining',
+            'ready': False,
+            'drain': drain_service.get_state(),
+            'timestamp': datetime.now().isoformat(),
+            'service': 'Flask-SocketIO Chat Server'
+        }), 503
+
     return jsonify({
         'status': 'healthy',
+        'ready': True,
         'timestamp': datetime.now().isoformat(),
         'service': 'Flask-SocketIO Chat Server'
     }), 200
@@ -61,7 +77,8 @@ def get_clients():
     for client_id, client_data in connected_clients.items():
         clients_info.append({
             'client_id': client_id,
-            'connected_at': client_data['connected_at'].isoformat()
+            'connected_at': client_data['connected_at'].isoformat(),
+            'status': get_presence_status(client_id)
         })
 
     return jsonify({
@@ -71,6 +88,278 @@ def get_clients():
     }), 200
 
 
+@api_bp.route('/compression', methods=['GET'])
+def get_compression():
+    """
+    Get compression statistics
+    Returns per-connection WebSocket byte counters and long-polling totals
+
+    Returns:
+        JSON response with compression counters
+    """
+    clients_info = []
+    for client_id, client_data in connected_clients.items():
+        clients_info.append({
+            'client_id': client_id,
+            'stats': get_connection_stats(client_data.get('eio_sid'))
+        })
+
+    return jsonify({
+        'settings': {
+            'http_compression': current_app.config['SOCKETIO_HTTP_COMPRESSION'],
+            'websocket_compression': current_app.config['SOCKETIO_WEBSOCKET_COMPRESSION'],
+            'threshold': current_app.config['SOCKETIO_COMPRESSION_THRESHOLD'],
+            'level': current_app.config['SOCKETIO_COMPRESSION_LEVEL'],
+            'server_no_context_takeover': current_app.config['SOCKETIO_SERVER_NO_CONTEXT_TAKEOVER'],
+            'client_no_context_takeover': current_app.config['SOCKETIO_CLIENT_NO_CONTEXT_TAKEOVER']
+        },
+        'polling': get_polling_stats(),
+        'clients': clients_info,
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+
+@api_bp.route('/users/search', methods=['GET'])
+def search_users():
+    """
+    User search endpoint
+    Returns users whose username starts with the query
+
+    Query Args:
+        q: Username prefix
+        limit: Maximum number of results (capped by USER_SEARCH_MAX_RESULTS)
+
+    Returns:
+        JSON response with matching users
+    """
+    query, limit = user_directory.parse_search(
+        request.args.get('q', ''),
+        request.args.get('limit', type=int),
+        current_app.config['USER_SEARCH_MAX_RESULTS'],
+    )
+
+    return jsonify({
+        'query': query,
+        'results': user_directory.search_users(query, limit),
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+
+@api_bp.route('/admin/drain', methods=['POST'])
+@admin_required
+def start_drain():
+    """
+    Drain endpoint (admin)
+    Stops accepting connections and disconnects clients in paced waves. The
+    process stays up, drained, until DELETE /api/admin/drain cancels it
+
+    Returns:
+        JSON response with drain progress
+    """
+    started = drain_service.start_drain(
+        current_app._get_current_object(), socketio, connected_clients
+    )
+    return jsonify({
+        'started': started,
+        'drain': drain_service.get_state(),
+        'timestamp': datetime.now().isoformat()
+    }), 202 if started else 409
+
+
+@api_bp.route('/admin/drain', methods=['DELETE'])
+@admin_required
+def cancel_drain():
+    """
+    Cancel drain endpoint (admin)
+    Stops a drain in progress, or leaves the drained state, and accepts
+    connections again
+
+    Returns:
+        JSON response with drain state
+    """
+    cancelled = drain_service.cancel_drain()
+    return jsonify({
+        'cancelled': cancelled,
+        'drain': drain_service.get_state(),
+        'timestamp': datetime.now().isoformat()
+    }), 200 if cancelled else 409
+
+
+@api_bp.route('/admin/drain', methods=['GET'])
+@admin_required
+def get_drain():
+    """
+    Drain status endpoint (admin)
+
+    Returns:
+        JSON response with drain progress
+    """
+    return jsonify({
+        'drain': drain_service.get_state(),
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+
+@api_bp.route('/admin/memory', methods=['GET'])
+@admin_required
+def get_memory():
+    """
+    Memory overview endpoint (admin)
+    Returns process RSS and the estimated memory cost per connection
+
+    Returns:
+        JSON response with memory statistics
+    """
+    report = memory_service.get_memory_report(connected_clients, socketio.server.eio.sockets)
+    report['timestamp'] = datetime.now().isoformat()
+    return jsonify(report), 200
+
+
+@api_bp.route('/admin/memory/snapshot', methods=['POST'])
+@admin_required
+def take_memory_snapshot():
+    """
+    Tracemalloc snapshot endpoint (admin)
+    Takes a snapshot (starting tracemalloc if needed) and returns the top
+    allocation sites and the diff against the previous snapshot
+
+    Query Args:
+        top: Number of allocation sites to return (default 20)
+
+    Returns:
+        JSON response with allocation statistics
+    """
+    top = request.args.get('top', 20, type=int)
+    result = memory_service.take_snapshot(
+        top=top,
+        frames=current_app.config['MEMORY_TRACEMALLOC_FRAMES']
+    )
+    result['timestamp'] = datetime.now().isoformat()
+    return jsonify(result), 200
+
+
+@api_bp.route('/admin/memory/snapshot', methods=['DELETE'])
+@admin_required
+def stop_memory_tracing():
+    """
+    Stop tracemalloc endpoint (admin)
+    Stops allocation tracing and discards stored snapshots
+
+    Returns:
+        JSON response confirming tracing is stopped
+    """
+    memory_service.stop_tracing()
+    return jsonify({
+        'tracemalloc': False,
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+
+@api_bp.route('/admin/profile', methods=['GET'])
+@admin_required
+def sample_profile():
+    """
+    Sampling profiler endpoint (admin)
+    Samples the stacks of all threads and green threads for a few seconds;
+    stacks are rooted at the SocketIO event or HTTP request being served and
+    carry the SQL query being run
+
+    Query Args:
+        seconds: Sampling duration (default 5, max PROFILER_MAX_SECONDS)
+        interval_ms: Milliseconds between samples (default PROFILER_INTERVAL_MS)
+        mode: 'cpu' (running stacks, default) or 'wall' (include parked green threads)
+        format: 'speedscope' (JSON, default) or 'collapsed' (text for flamegraph.pl)
+
+    Returns:
+        Profile in the requested format
+    """
+    config = current_app.config
+    seconds = request.args.get('seconds', 5, type=float)
+    interval_ms = request.args.get('interval_ms', config['PROFILER_INTERVAL_MS'], type=float)
+    mode = request.args.get('mode', profiler_service.CPU)
+    output = request.args.get('format', 'speedscope')
+
+    if not 0 < seconds <= config['PROFILER_MAX_SECONDS'] or not 1 <= interval_ms <= 1000 \
+            or mode not in (profiler_service.CPU, profiler_service.WALL) \
+            or output not in ('speedscope', 'collapsed'):
+        return jsonify({
+            'error': 'Invalid parameters',
+            'message': f"seconds must be in (0, {config['PROFILER_MAX_SECONDS']}], "
+                       "interval_ms in [1, 1000], mode cpu|wall, format speedscope|collapsed",
+            'timestamp': datetime.now().isoformat()
+        }), 400
+
+    profile = profiler_service.sample(seconds, interval_ms / 1000, mode, sleep=socketio.sleep)
+    if profile is None:
+        return jsonify({
+            'error': 'Profiler busy',
+            'message': 'Another profile is already running',
+            'timestamp': datetime.now().isoformat()
+        }), 409
+
+    if output == 'collapsed':
+        return Response(profiler_service.to_collapsed(profile), mimetype='text/plain')
+    return jsonify(profiler_service.to_speedscope(profile)), 200
+
+
+@api_bp.route('/admin/profile/handler', methods=['POST'])
+@admin_required
+def arm_handler_profile():
+    """
+    Handler profile endpoint (admin)
+    Runs the next invocation of a SocketIO event handler under cProfile
+
+    Query Args:
+        event: SocketIO event name (e.g. 'message')
+
+    Returns:
+        JSON response with the capture state
+    """
+    event = request.args.get('event', '').strip()
+    if not event:
+        return jsonify({
+            'error': 'Missing event',
+            'message': 'Query parameter "event" is required',
+            'timestamp': datetime.now().isoformat()
+        }), 400
+
+    profiler_service.arm_capture(event)
+    return jsonify({
+        'capture': profiler_service.get_capture(),
+        'timestamp': datetime.now().isoformat()
+    }), 202
+
+
+@api_bp.route('/admin/profile/handler', methods=['GET'])
+@admin_required
+def get_handler_profile():
+    """
+    Handler profile result endpoint (admin)
+
+    Query Args:
+        sort: pstats sort key (default 'cumulative')
+        top: Number of functions to list (default 30)
+
+    Returns:
+        JSON response with the capture state and pstats output once captured
+    """
+    sort = request.args.get('sort', 'cumulative')
+    top = request.args.get('top', 30, type=int)
+    try:
+        capture = profiler_service.get_capture(sort, top)
+    except KeyError:
+        return jsonify({
+            'error': 'Invalid sort key',
+            'message': f"Unknown pstats sort key: {sort}",
+            'timestamp': datetime.now().isoformat()
+        }), 400
+
+    return jsonify({
+        'capture': capture,
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+
 @api_bp.route('/', methods=['GET'])
 def api_root():
     """
@@ -86,10 +375,20 @@ def api_root():
         'endpoints': {
             'health': '/api/health',
             'status': '/api/status',
-            'clients': '/api/clients'
+            'clients': '/api/clients',
+            'compression': '/api/compression',
+            'attachments': '/api/attachments',
+            'user_search': '/api/users/search?q=<prefix>',
+            'drain': '/api/admin/drain',
+            'memory': '/api/admin/memory',
+            'memory_snapshot': '/api/admin/memory/snapshot',
+            'profile': '/api/admin/profile?seconds=<n>',
+            'handler_profile': '/api/admin/profile/handler?event=<name>'
         },
         'websocket': {
-            'events': ['connect', 'disconnect', 'echo', 'message', 'ping', 'get_status']
+            'events': ['connect', 'disconnect', 'echo', 'message', 'message_batch', 'ping', 'get_status',
+                       'get_compression_stats', 'join_conversation', 'leave_conversation',
+                       'typing', 'watch_presence', 'search_users']
         },
         'timestamp': datetime.now().isoformat()
     }), 200
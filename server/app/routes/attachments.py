@@ -0,0 +1,192 @@
+"""
+Attachment Routes
+HTTP endpoints for resumable chunked uploads and file downloads
+
+Upload flow:
+    1. POST /api/attachments with {'filename', 'size', 'content_type'}
+    2. PUT /api/attachments/<id>/content with a Content-Range header per chunk
+       (GET /api/attachments/<id> returns the offset to resume from)
+    3. Send the returned attachment id with a chat message over the socket
+"""
+
+import os
+import re
+import uuid
+from datetime import datetime
+from flask import Blueprint, jsonify, current_app, request, send_file
+from werkzeug.utils import secure_filename
+from app.models.attachment import Attachment
+from app.services import attachment_service
+
+# Create Blueprint
+attachments_bp = Blueprint('attachments', __name__)
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+# Declared content types that are safe to render inline on the chat origin;
+# anything else (HTML, SVG, ...) is served as a download
+INLINE_CONTENT_TYPES = frozenset({
+    'image/png', 'image/jpeg', 'image/gif', 'image/webp',
+    'audio/mpeg', 'audio/ogg', 'video/mp4', 'video/webm',
+})
+
+
+def _error(error, message, status):
+    """Build a JSON error response"""
+    return jsonify({
+        'error': error,
+        'message': message,
+        'timestamp': datetime.now().isoformat()
+    }), status
+
+
+def _upload_status(attachment):
+    """Build the upload progress payload for an attachment"""
+    return {
+        'id': attachment['id'],
+        'filename': attachment['filename'],
+        'content_type': attachment['content_type'],
+        'size': attachment['size'],
+        'received': attachment['received'],
+        'status': attachment['status'],
+        'sha256': attachment['sha256'],
+        'chunk_size': current_app.config['ATTACHMENT_CHUNK_SIZE'],
+        'upload_url': f"/api/attachments/{attachment['id']}/content",
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+@attachments_bp.route('', methods=['POST'])
+def create_upload():
+    """
+    Start a chunked upload
+
+    Returns:
+        JSON response with the attachment id and upload URL
+    """
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename')
+    size = data.get('size')
+    content_type = data.get('content_type') or 'application/octet-stream'
+
+    if not filename or not isinstance(size, int) or size <= 0:
+        return _error('Invalid upload', 'filename and a positive integer size are required', 400)
+
+    max_size = current_app.config['ATTACHMENT_MAX_SIZE']
+    if size > max_size:
+        return _error('File too large', f'Attachments cannot exceed {max_size} bytes', 413)
+
+    max_pending = current_app.config['ATTACHMENT_MAX_PENDING_UPLOADS']
+    if Attachment.count_uploading() >= max_pending:
+        return _error('Too many uploads',
+                      'Too many uploads in progress, try again later', 429)
+
+    attachment = Attachment.create_attachment(uuid.uuid4().hex, filename, content_type, size)
+    return jsonify(_upload_status(attachment)), 201
+
+
+@attachments_bp.route('/<attachment_id>', methods=['GET'])
+def get_upload(attachment_id):
+    """
+    Get upload progress and metadata (used to resume an upload)
+
+    Args:
+        attachment_id: Attachment ID
+
+    Returns:
+        JSON response with upload status
+    """
+    attachment = Attachment.get_attachment(attachment_id)
+    if attachment is None:
+        return _error('Not Found', 'Attachment not found', 404)
+
+    return jsonify(_upload_status(attachment)), 200
+
+
+@attachments_bp.route('/<attachment_id>/content', methods=['PUT'])
+def upload_chunk(attachment_id):
+    """
+    Upload one chunk of an attachment
+    Expects a 'Content-Range: bytes start-end/total' header; the body is
+    streamed to disk without being buffered in memory
+
+    Args:
+        attachment_id: Attachment ID
+
+    Returns:
+        JSON response with upload status
+    """
+    attachment = Attachment.get_attachment(attachment_id)
+    if attachment is None:
+        return _error('Not Found', 'Attachment not found', 404)
+
+    match = CONTENT_RANGE_RE.match(request.headers.get('Content-Range', ''))
+    if not match:
+        return _error('Invalid range', 'Content-Range: bytes start-end/total is required', 400)
+
+    start, end, total = (int(value) for value in match.groups())
+    length = end - start + 1
+    if total != attachment['size'] or end < start:
+        return _error('Invalid range', 'Content-Range does not match the upload', 416)
+    if length > current_app.config['ATTACHMENT_CHUNK_SIZE']:
+        return _error('Chunk too large',
+                      f"Chunks cannot exceed {current_app.config['ATTACHMENT_CHUNK_SIZE']} bytes", 413)
+    if request.content_length is not None and request.content_length != length:
+        return _error('Invalid range', 'Content-Length does not match Content-Range', 400)
+
+    storage_dir = current_app.config['ATTACHMENTS_DIR']
+    received, error = attachment_service.write_chunk(
+        storage_dir, attachment, start, request.stream, length
+    )
+    if error:
+        status = error.pop('status')
+        response = {**error, 'received': attachment['received'],
+                    'timestamp': datetime.now().isoformat()}
+        return jsonify(response), status
+
+    if received == attachment['size']:
+        sha256 = attachment_service.finalize_upload(storage_dir, attachment_id)
+        Attachment.mark_complete(attachment_id, sha256)
+        current_app.logger.info(f"Attachment {attachment_id} uploaded ({received} bytes)")
+    else:
+        Attachment.update_received(attachment_id, received)
+
+    return jsonify(_upload_status(Attachment.get_attachment(attachment_id))), 200
+
+
+@attachments_bp.route('/<attachment_id>/content', methods=['GET'])
+def download(attachment_id):
+    """
+    Download an attachment
+    Supports Range requests and conditional requests via the SHA-256 ETag.
+    With USE_X_SENDFILE enabled the body is handed to the front-end server.
+    The content type is declared by the uploader, so only allowlisted media
+    types are served inline, and the response is sandboxed either way.
+
+    Args:
+        attachment_id: Attachment ID
+
+    Returns:
+        File response
+    """
+    attachment = Attachment.get_attachment(attachment_id)
+    if attachment is None or attachment['status'] != Attachment.COMPLETE:
+        return _error('Not Found', 'Attachment not found', 404)
+
+    path = attachment_service.get_path(current_app.config['ATTACHMENTS_DIR'], attachment_id)
+    if not os.path.exists(path):
+        return _error('Not Found', 'Attachment file is missing', 404)
+
+    content_type = attachment['content_type'].split(';')[0].strip().lower()
+    response = send_file(
+        path,
+        mimetype=attachment['content_type'],
+        as_attachment=content_type not in INLINE_CONTENT_TYPES,
+        download_name=secure_filename(attachment['filename']) or attachment_id,
+        conditional=True,
+        etag=attachment['sha256'],
+        max_age=current_app.config['ATTACHMENT_CACHE_MAX_AGE'],
+    )
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.headers['Content-Security-Policy'] = 'sandbox'
+    return response
@@ -0,0 +1,228 @@
+"""
+Attachment Storage Service
+Writes chunked uploads to disk with streaming hashing
+
+Upload bodies are copied from the request stream to disk in small blocks, so
+a file is never held in memory as a whole. Each upload keeps an incremental
+SHA-256 hasher; if the server restarted mid-upload, the hasher is rebuilt once
+from the bytes already on disk.
+
+Uploads that receive no chunk for ATTACHMENT_UPLOAD_TTL seconds are abandoned:
+a background task deletes their partial file, hasher and database row.
+"""
+
+import hashlib
+import logging
+import os
+from app.models.attachment import Attachment
+
+logger = logging.getLogger(__name__)
+
+# Size of blocks copied from the request stream to disk
+BLOCK_SIZE = 64 * 1024
+
+# Incremental hashers for uploads in progress
+# Structure: {attachment_id: hashlib.sha256}
+_hashers = {}
+
+# Uploads currently receiving a chunk (rejects concurrent writes)
+_active_uploads = set()
+
+# App whose cleanup task is running, set by init_attachments
+_cleanup = {'app': None}
+
+
+def get_path(storage_dir, attachment_id, partial=False):
+    """
+    Get the on-disk path of an attachment
+
+    Args:
+        storage_dir: Attachment storage root
+        attachment_id: Attachment ID (hex string)
+        partial: Return the path of the in-progress upload file
+
+    Returns:
+        Absolute file path
+    """
+    path = os.path.join(os.path.abspath(storage_dir), attachment_id[:2], attachment_id)
+    return path + '.part' if partial else path
+
+
+def _restore_hasher(path, received):
+    """Rebuild the hasher of an interrupted upload from the bytes on disk"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = received
+        while remaining:
+            block = f.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def write_chunk(storage_dir, attachment, offset, stream, length):
+    """
+    Append a chunk from a request stream to an upload
+
+    Args:
+        storage_dir: Attachment storage root
+        attachment: Attachment dict from the database
+        offset: Byte offset of the chunk (must equal the bytes received so far)
+        stream: File-like request body
+        length: Number of bytes in the chunk
+
+    Returns:
+        Tuple (received, error): total bytes received after the chunk, or an
+        error dict with 'error', 'message' and 'status'
+    """
+    attachment_id = attachment['id']
+    received = attachment['received']
+
+    if attachment['status'] != 'uploading':
+        return None, {'error': 'Upload complete', 'message': 'Attachment is already complete',
+                      'status': 409}
+    if offset != received:
+        return None, {'error': 'Offset mismatch',
+                      'message': f'Expected chunk at offset {received}', 'status': 409}
+    if length <= 0 or offset + length > attachment['size']:
+        return None, {'error': 'Invalid range',
+                      'message': 'Chunk exceeds the declared file size', 'status': 416}
+    if attachment_id in _active_uploads:
+        return None, {'error': 'Upload busy',
+                      'message': 'Another chunk is being written', 'status': 409}
+
+    _active_uploads.add(attachment_id)
+    try:
+        path = get_path(storage_dir, attachment_id, partial=True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path):
+            open(path, 'wb').close()
+
+        hasher = _hashers.get(attachment_id)
+        if hasher is None:
+            hasher = _hashers[attachment_id] = _restore_hasher(path, received)
+
+        with open(path, 'r+b') as f:
+            # Drop any bytes from a chunk that was interrupted mid-write
+            f.truncate(received)
+            f.seek(received)
+            remaining = length
+            while remaining:
+                block = stream.read(min(BLOCK_SIZE, remaining))
+                if not block:
+                    # Client went away; keep what arrived so it can resume
+                    break
+                f.write(block)
+                hasher.update(block)
+                remaining -= len(block)
+                received += len(block)
+
+        return received, None
+    finally:
+        _active_uploads.discard(attachment_id)
+
+
+def finalize_upload(storage_dir, attachment_id):
+    """
+    Move a fully received upload into place and return its digest
+
+    Args:
+        storage_dir: Attachment storage root
+        attachment_id: Attachment ID
+
+    Returns:
+        Hex SHA-256 digest of the file
+    """
+    hasher = _hashers.pop(attachment_id)
+    os.replace(get_path(storage_dir, attachment_id, partial=True),
+               get_path(storage_dir, attachment_id))
+    return hasher.hexdigest()
+
+
+def discard_upload(storage_dir, attachment_id):
+    """
+    Drop the hasher and partial file of an unfinished upload
+
+    Args:
+        storage_dir: Attachment storage root
+        attachment_id: Attachment ID
+    """
+    _hashers.pop(attachment_id, None)
+    try:
+        os.remove(get_path(storage_dir, attachment_id, partial=True))
+    except FileNotFoundError:
+        pass
+
+
+def cleanup_stale_uploads(storage_dir, max_idle):
+    """
+    Delete uploads that received no chunk for a while (needs an app context)
+
+    Args:
+        storage_dir: Attachment storage root
+        max_idle: Seconds an upload may sit idle
+
+    Returns:
+        Number of uploads deleted
+    """
+    removed = 0
+    for attachment in Attachment.get_stale_uploads(max_idle):
+        attachment_id = attachment['id']
+        if attachment_id in _active_uploads:
+            continue
+        discard_upload(storage_dir, attachment_id)
+        Attachment.delete_attachment(attachment_id)
+        removed += 1
+    return removed
+
+
+def init_attachments(app, socketio):
+    """
+    Start the background task that deletes abandoned uploads
+
+    Args:
+        app: Flask application instance
+        socketio: SocketIO instance
+    """
+    _cleanup['app'] = app
+    interval = app.config['ATTACHMENT_CLEANUP_INTERVAL']
+    if not interval:
+        return
+
+    def cleanup_loop():
+        # Stops once a newer app took over the cleanup
+        while _cleanup['app'] is app:
+            socketio.sleep(interval)
+            try:
+                with app.app_context():
+                    removed = cleanup_stale_uploads(
+                        app.config['ATTACHMENTS_DIR'], app.config['ATTACHMENT_UPLOAD_TTL']
+                    )
+                if removed:
+                    logger.info(f"Deleted {removed} abandoned uploads")
+            except Exception as e:
+                logger.error(f"Upload cleanup failed: {str(e)}", exc_info=True)
+
+    socketio.start_background_task(cleanup_loop)
+
+
+def to_reference(attachment):
+    """
+    Build the small attachment reference sent over the socket
+
+    Args:
+        attachment: Attachment dict from the database
+
+    Returns:
+        Dict with id, filename, content type, size, digest and download URL
+    """
+    return {
+        'id': attachment['id'],
+        'filename': attachment['filename'],
+        'content_type': attachment['content_type'],
+        'size': attachment['size'],
+        'sha256': attachment['sha256'],
+        'url': f"/api/attachments/{attachment['id']}/content",
+    }
@@ -0,0 +1,146 @@
+"""
+Outbound Coalescing Service
+Packs events sent to a client within a short window into a single frame
+
+Clients opt in when connecting (query string `coalesce=1`). Events for an
+opted-in client are buffered and delivered as one `event_batch` event once the
+window elapses or the buffer is full; other clients receive events one by one
+as before. Replies, room fan-out (typing) and broadcasts (client_joined,
+client_left) all go through here, so busy rooms do not flood opted-in clients
+with tiny frames.
+"""
+
+# Buffered events for clients that opted in
+# Structure: {client_id: [{'event': str, 'data': any}, ...]}
+pending_events = {}
+
+# Clients with coalescing enabled
+coalescing_clients = set()
+
+# Window (seconds) and buffer size, set by init_coalescing
+_settings = {'window': 0.01, 'max_events': 50}
+
+
+def init_coalescing(app):
+    """
+    Load the coalescing window and buffer size from the config
+
+    Args:
+        app: Flask application instance
+    """
+    _settings['window'] = app.config['OUTBOUND_COALESCE_WINDOW_MS'] / 1000.0
+    _settings['max_events'] = app.config['OUTBOUND_COALESCE_MAX_EVENTS']
+
+
+def enable(client_id):
+    """
+    Enable outbound coalescing for a client
+
+    Args:
+        client_id: Socket id of the client
+    """
+    coalescing_clients.add(client_id)
+
+
+def disable(client_id):
+    """
+    Disable coalescing for a client and drop anything still buffered
+
+    Args:
+        client_id: Socket id of the client
+    """
+    coalescing_clients.discard(client_id)
+    pending_events.pop(client_id, None)
+
+
+def flush(socketio, client_id):
+    """
+    Deliver a client's buffered events as one frame
+
+    Args:
+        socketio: SocketIO instance
+        client_id: Socket id of the client
+    """
+    events = pending_events.pop(client_id, None)
+    if events:
+        socketio.emit("event_batch", {"events": events}, to=client_id)
+
+
+def flush_all(socketio):
+    """
+    Deliver buffered events for every client
+
+    Args:
+        socketio: SocketIO instance
+    """
+    for client_id in list(pending_events):
+        flush(socketio, client_id)
+
+
+def _buffer(socketio, client_id, event, data):
+    """Add an event to a coalescing client's buffer"""
+    events = pending_events.get(client_id)
+    if events is None:
+        events = pending_events[client_id] = []
+
+        def flush_later():
+            socketio.sleep(_settings['window'])
+            # Only flush the buffer this timer was started for: it may have
+            # been flushed early (max_events) and replaced by a newer one
+            if pending_events.get(client_id) is events:
+                flush(socketio, client_id)
+
+        socketio.start_background_task(flush_later)
+
+    events.append({"event": event, "data": data})
+    if len(events) >= _settings['max_events']:
+        flush(socketio, client_id)
+
+
+def send(socketio, client_id, event, data):
+    """
+    Send an event to a single client, coalescing if the client opted in
+
+    Args:
+        socketio: SocketIO instance
+        client_id: Socket id of the recipient
+        event: Event name
+        data: Event payload
+    """
+    if client_id in coalescing_clients:
+        _buffer(socketio, client_id, event, data)
+    else:
+        socketio.emit(event, data, to=client_id)
+
+
+def send_to_room(socketio, room, event, data, skip_sid=None):
+    """
+    Send an event to every client in a room (or everyone), coalescing for
+    clients that opted in
+
+    Non-coalescing clients get a single regular emit; opted-in recipients are
+    skipped by it and buffered instead.
+
+    Args:
+        socketio: SocketIO instance
+        room: Room name, or None to broadcast to all connected clients
+        event: Event name
+        data: Event payload
+        skip_sid: Socket id that must not receive the event
+    """
+    if room is None:
+        buffered = [client_id for client_id in coalescing_clients if client_id != skip_sid]
+    elif coalescing_clients:
+        buffered = [
+            client_id
+            for client_id, _ in socketio.server.manager.get_participants("/", room)
+            if client_id in coalescing_clients and client_id != skip_sid
+        ]
+    else:
+        buffered = []
+
+    skipped = buffered + ([skip_sid] if skip_sid is not None else [])
+    socketio.emit(event, data, to=room, skip_sid=skipped or None)
+
+    for client_id in buffered:
+        _buffer(socketio, client_id, event, data)
@@ -0,0 +1,282 @@
+"""
+Compression Service
+Configures WebSocket permessage-deflate and HTTP long-polling compression,
+and keeps per-connection byte counters before and after compression
+
+Every long-polling response is counted, including those below the
+compression threshold, both per connection and in the polling totals.
+"""
+
+import threading
+import zlib
+from datetime import datetime
+from urllib.parse import parse_qs
+
+try:
+    # Local to each green thread even though eventlet is not monkey patched
+    # (each OS thread has its own greenlet, so threads stay separate too)
+    from eventlet.corolocal import local as _request_local
+except ImportError:
+    from threading import local as _request_local
+
+# Compression counters keyed by Engine.IO session id
+# Structure: {eio_sid: {'transport': str, 'messages': int,
+#                       'compressed_messages': int, 'bytes_in': int,
+#                       'bytes_out': int, 'started_at': datetime}}
+compression_stats = {}
+
+_stats_lock = threading.Lock()
+
+# Uncompressed size of the long-polling response being served, set when the
+# response is compressed
+_polling_request = _request_local()
+
+
+def _new_stats(transport):
+    """
+    Create an empty counter record
+
+    Args:
+        transport: Transport name the counters belong to
+
+    Returns:
+        dict: Counter record
+    """
+    return {
+        'transport': transport,
+        'messages': 0,
+        'compressed_messages': 0,
+        'bytes_in': 0,
+        'bytes_out': 0,
+        'started_at': datetime.now(),
+    }
+
+
+# Aggregate counters for all HTTP long-polling responses, handshakes included
+polling_stats = _new_stats('polling')
+
+
+def _record(stats, size_in, size_out):
+    """
+    Add one payload to a counter record
+
+    Args:
+        stats: Counter record to update
+        size_in: Payload size before compression
+        size_out: Payload size after compression
+    """
+    with _stats_lock:
+        stats['messages'] += 1
+        if size_out != size_in:
+            stats['compressed_messages'] += 1
+        stats['bytes_in'] += size_in
+        stats['bytes_out'] += size_out
+
+
+def format_stats(stats):
+    """
+    Convert a counter record into a JSON-serializable dict
+
+    Args:
+        stats: Counter record
+
+    Returns:
+        dict: Counters with the compression ratio and saved bytes added
+    """
+    result = dict(stats)
+    result['started_at'] = stats['started_at'].isoformat()
+    result['bytes_saved'] = stats['bytes_in'] - stats['bytes_out']
+    result['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 4) if stats['bytes_in'] else None
+    return result
+
+
+def get_connection_stats(eio_sid):
+    """
+    Get compression counters for a single connection
+
+    Args:
+        eio_sid: Engine.IO session id
+
+    Returns:
+        Formatted counter dict or None if the connection has no counters
+    """
+    stats = compression_stats.get(eio_sid)
+    return format_stats(stats) if stats else None
+
+
+def discard_connection_stats(eio_sid):
+    """
+    Drop the counters of a closed connection
+
+    Args:
+        eio_sid: Engine.IO session id
+    """
+    compression_stats.pop(eio_sid, None)
+
+
+def get_polling_stats():
+    """
+    Get aggregate compression counters for HTTP long-polling responses
+
+    Returns:
+        Formatted counter dict
+    """
+    return format_stats(polling_stats)
+
+
+def make_websocket_class(base, options):
+    """
+    Build an Engine.IO websocket class that applies the compression options
+
+    Args:
+        base: Engine.IO websocket WSGI class for the async mode in use
+        options: Compression options from the application config
+
+    Returns:
+        WebSocketWSGI subclass
+    """
+    from eventlet.websocket import RFC6455WebSocket
+
+    class CompressingWebSocket(RFC6455WebSocket):
+        """RFC 6455 websocket with configurable deflate and byte counters"""
+
+        stats = None
+        _skip_deflate = False
+
+        def _get_permessage_deflate_enc(self):
+            deflate = self.extensions.get('permessage-deflate')
+            if deflate is None or self._skip_deflate:
+                return None
+
+            def _make():
+                return zlib.compressobj(options['level'], zlib.DEFLATED,
+                                        -deflate.get('server_max_window_bits', zlib.MAX_WBITS))
+
+            if deflate.get('server_no_context_takeover'):
+                return _make()
+            if self._deflate_enc is None:
+                self._deflate_enc = _make()
+            return self._deflate_enc
+
+        def _pack_message(self, message, **kwargs):
+            size_in = len(message.encode('utf-8') if isinstance(message, str) else message)
+            self._skip_deflate = size_in < options['threshold']
+            frame = super()._pack_message(message, **kwargs)
+            if self.stats is not None and not kwargs.get('control_code'):
+                # Frame header is 2, 4 or 10 bytes for unmasked server frames
+                header = 2 if len(frame) - 2 <= 125 else (4 if len(frame) - 4 <= 65535 else 10)
+                _record(self.stats, size_in, len(frame) - header)
+            return frame
+
+    class CompressingWebSocketWSGI(base):
+        """Engine.IO websocket endpoint that negotiates compression from config"""
+
+        def __init__(self, handler, server):
+            super().__init__(handler, server)
+            # The handler is bound to the Engine.IO socket that owns this upgrade
+            self.eio_sid = getattr(getattr(handler, '__self__', None), 'sid', None)
+
+        def _negotiate_permessage_deflate(self, extensions):
+            if not options['enabled']:
+                return None
+            deflate = super()._negotiate_permessage_deflate(extensions)
+            if deflate is not None:
+                if options['server_no_context_takeover']:
+                    deflate['server_no_context_takeover'] = True
+                if options['client_no_context_takeover']:
+                    deflate['client_no_context_takeover'] = True
+            return deflate
+
+        def _handle_hybi_request(self, environ):
+            ws = super()._handle_hybi_request(environ)
+            # eventlet instantiates RFC6455WebSocket directly after the handshake
+            ws.__class__ = CompressingWebSocket
+            ws.stats = _new_stats('websocket')
+            if self.eio_sid:
+                compression_stats[self.eio_sid] = ws.stats
+            return ws
+
+        def __call__(self, environ, start_response):
+            try:
+                return super().__call__(environ, start_response)
+            finally:
+                if self.eio_sid:
+                    compression_stats.pop(self.eio_sid, None)
+
+    return CompressingWebSocketWSGI
+
+
+def init_compression(app, socketio):
+    """
+    Apply compression settings to the Engine.IO server
+
+    Args:
+        app: Flask application instance
+        socketio: SocketIO instance (after init_app)
+    """
+    eio = socketio.server.eio
+    level = app.config['SOCKETIO_COMPRESSION_LEVEL']
+    options = {
+        'enabled': app.config['SOCKETIO_WEBSOCKET_COMPRESSION'],
+        'threshold': app.config['SOCKETIO_COMPRESSION_THRESHOLD'],
+        'level': level,
+        'server_no_context_takeover': app.config['SOCKETIO_SERVER_NO_CONTEXT_TAKEOVER'],
+        'client_no_context_takeover': app.config['SOCKETIO_CLIENT_NO_CONTEXT_TAKEOVER'],
+    }
+
+    # HTTP long-polling: honour the configured level
+    def _gzip(response):
+        _polling_request.size_in = len(response)
+        compressed = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressed.compress(response) + compressed.flush()
+
+    def _deflate(response):
+        _polling_request.size_in = len(response)
+        return zlib.compress(response, level)
+
+    eio._gzip = _gzip
+    eio._deflate = _deflate
+
+    # ... and count every response, compressed or not, around the whole request
+    handle_request = eio.handle_request
+
+    def handle_polling_request(environ, start_response):
+        query = parse_qs(environ.get('QUERY_STRING', ''))
+        if environ.get('REQUEST_METHOD') != 'GET' or query.get('transport') != ['polling']:
+            return handle_request(environ, start_response)
+
+        _polling_request.size_in = None
+        body = handle_request(environ, start_response)
+        size_out = sum(len(chunk) for chunk in body)
+        size_in = _polling_request.size_in or size_out
+        _record(polling_stats, size_in, size_out)
+
+        sid = query.get('sid', [None])[0]
+        socket = eio.sockets.get(sid) if sid else None
+        if socket is None:
+            compression_stats.pop(sid, None)
+        elif not socket.upgraded:
+            stats = compression_stats.get(sid)
+            if stats is None:
+                stats = compression_stats[sid] = _new_stats('polling')
+            # A websocket upgrade in progress keeps its own counters
+            if stats['transport'] == 'polling':
+                _record(stats, size_in, size_out)
+        return body
+
+    eio.handle_request = handle_polling_request
+
+    # WebSocket: permessage-deflate is only available with the eventlet server
+    if eio.async_mode == 'eventlet' and eio._async.get('websocket') is not None:
+        # Copy the driver table so the shared module-level dict stays untouched
+        eio._async = dict(eio._async)
+        eio._async['websocket'] = make_websocket_class(eio._async['websocket'], options)
+    else:
+        app.logger.warning(
+            f"WebSocket compression not available in async mode '{eio.async_mode}'"
+        )
+
+    app.logger.info(
+        f"Compression configured: http={app.config['SOCKETIO_HTTP_COMPRESSION']}, "
+        f"websocket={options['enabled']}, threshold={options['threshold']}, level={level}"
+    )
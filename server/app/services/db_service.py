@@ -96,6 +96,42 @@ def init_db(app):
         )
     ''')
 
+    # History pages are read per conversation in id order
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation_id
+        ON messages (conversation_id, id)
+    ''')
+
+    # Attachments table (chunked uploads stored on disk, linked to messages)
+    # Messages are identified by (conversation_id, message_id): the log
+    # storage engine numbers messages per conversation
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attachments (
+            id TEXT PRIMARY KEY,
+            conversation_id TEXT,
+            message_id INTEGER,
+            filename TEXT NOT NULL,
+            content_type TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            received INTEGER NOT NULL DEFAULT 0,
+            sha256 TEXT,
+            status TEXT NOT NULL DEFAULT 'uploading',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP,
+            completed_at TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_attachments_message
+        ON attachments (conversation_id, message_id)
+    ''')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_attachments_status
+        ON attachments (status)
+    ''')
+
     # Sessions table (for future use)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS sessions (
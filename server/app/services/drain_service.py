@@ -0,0 +1,178 @@
+"""
+Drain Service
+Gracefully empties the server before a restart
+
+While draining, new connections are refused and /api/health reports
+not-ready. Pending writes are flushed, then connected clients are sent a
+`server_draining` event with a randomized reconnect delay and disconnected in
+paced waves, so they do not all reconnect to the next instance at once.
+
+A drain started without an on_complete callback (the admin route) leaves the
+process up in the drained state until cancel_drain() puts it back in service.
+"""
+
+import logging
+import random
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds given to the last wave's packets before completing
+FINAL_WAVE_GRACE = 0.5
+
+IDLE = 'idle'
+DRAINING = 'draining'
+DRAINED = 'drained'
+
+_state = {
+    'status': IDLE,
+    'started_at': None,
+    'finished_at': None,
+    'total_clients': 0,
+    'disconnected': 0,
+}
+
+# Incremented by every start and cancel; a drain task stops once it changes
+_generation = {'value': 0}
+
+# Callables run with the app before clients are disconnected
+_flush_hooks = []
+
+
+def is_draining():
+    """
+    Check whether the server is draining or drained
+
+    Returns:
+        True if new connections must be refused
+    """
+    return _state['status'] != IDLE
+
+
+def get_state():
+    """
+    Get the drain progress
+
+    Returns:
+        JSON-serializable state dict
+    """
+    state = dict(_state)
+    for key in ('started_at', 'finished_at'):
+        if state[key] is not None:
+            state[key] = state[key].isoformat()
+    return state
+
+
+def register_flush_hook(hook):
+    """
+    Register a callable that flushes pending writes before clients are dropped
+
+    Args:
+        hook: Callable receiving the Flask application
+    """
+    if hook not in _flush_hooks:
+        _flush_hooks.append(hook)
+
+
+def cancel_drain():
+    """
+    Stop a drain in progress (or leave the drained state) and accept
+    connections again
+
+    Returns:
+        False if the server was not draining, True otherwise
+    """
+    if not is_draining():
+        return False
+
+    _generation['value'] += 1
+    _state.update({'status': IDLE, 'finished_at': datetime.now()})
+    logger.warning(f"Drain cancelled after {_state['disconnected']} disconnects")
+    return True
+
+
+def start_drain(app, socketio, connected_clients, on_complete=None):
+    """
+    Start draining in a background task
+
+    Args:
+        app: Flask application instance
+        socketio: SocketIO instance
+        connected_clients: Registry of connected clients
+        on_complete: Optional callable run once every client is disconnected
+
+    Returns:
+        False if a drain was already in progress, True otherwise
+    """
+    if is_draining():
+        return False
+
+    _state.update({
+        'status': DRAINING,
+        'started_at': datetime.now(),
+        'finished_at': None,
+        'total_clients': len(connected_clients),
+        'disconnected': 0,
+    })
+    logger.warning(f"Drain started with {len(connected_clients)} connected clients")
+
+    config = app.config
+    wave_size = max(1, config['DRAIN_WAVE_SIZE'])
+    interval = config['DRAIN_WAVE_INTERVAL']
+    reconnect_min = max(0, config['DRAIN_RECONNECT_MIN_MS'])
+    reconnect_max = config['DRAIN_RECONNECT_MAX_MS']
+    if reconnect_max < reconnect_min:
+        logger.warning(f"DRAIN_RECONNECT_MAX_MS ({reconnect_max}) is below "
+                       f"DRAIN_RECONNECT_MIN_MS ({reconnect_min}), using {reconnect_min}")
+        reconnect_max = reconnect_min
+
+    _generation['value'] += 1
+    generation = _generation['value']
+
+    def drain():
+        for hook in _flush_hooks:
+            try:
+                hook(app)
+            except Exception as e:
+                logger.error(f"Drain flush hook failed: {str(e)}", exc_info=True)
+
+        while connected_clients and _generation['value'] == generation:
+            wave = list(connected_clients)[:wave_size]
+            for client_id in wave:
+                try:
+                    socketio.emit(
+                        "server_draining",
+                        {
+                            "reconnect_after_ms": random.randint(reconnect_min, reconnect_max),
+                            "timestamp": datetime.now().isoformat(),
+                        },
+                        to=client_id,
+                    )
+                    socketio.server.disconnect(client_id)
+                except Exception as e:
+                    logger.error(f"Failed to drain client {client_id}: {str(e)}")
+                # Drop clients whose disconnect handler did not run
+                connected_clients.pop(client_id, None)
+                _state['disconnected'] += 1
+
+            logger.info(f"Drain wave done: {_state['disconnected']}/{_state['total_clients']}")
+            if connected_clients:
+                socketio.sleep(interval)
+
+        # The last wave's server_draining packets are still queued on the
+        # transports; let them be written before on_complete stops the server
+        if _state['disconnected']:
+            socketio.sleep(max(interval, FINAL_WAVE_GRACE))
+
+        if _generation['value'] != generation:
+            return
+
+        _state['status'] = DRAINED
+        _state['finished_at'] = datetime.now()
+        logger.warning("Drain complete")
+
+        if on_complete is not None:
+            on_complete()
+
+    socketio.start_background_task(drain)
+    return True
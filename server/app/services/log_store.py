@@ -0,0 +1,540 @@
+"""
+Log-Structured Message Store
+Append-only storage engine for chat messages
+
+Each conversation gets its own directory holding numbered segment files and
+one index file:
+
+    <MESSAGE_LOG_DIR>/<conversation hash>/00000000.seg, 00000001.seg, ...
+    <MESSAGE_LOG_DIR>/<conversation hash>/index
+
+Records are appended to the active segment as
+    [payload length u32][sequence u64][crc32 u32][payload]
+and never rewritten in place, so an insert is a single write with no B-tree
+maintenance. The index is memory-mapped and holds one fixed-size entry per
+sequence number (segment, offset, length): seeking to a sequence is an array
+lookup, and history is read by walking the index backwards and reading each
+run of records with one pread.
+
+Deleting appends a tombstone and flags the index entry. Sealed segments whose
+dead bytes exceed the compaction ratio are rewritten without deleted records
+by the background compactor. After an unclean shutdown the index is rebuilt
+from the segments when the conversation is next opened.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from app.services.message_store import StorageEngine
+
+logger = logging.getLogger(__name__)
+
+# Segment record header: payload length (TOMBSTONE flag), sequence, crc32
+RECORD_HEADER = struct.Struct('<IQI')
+# Index header: magic, version, message count, active segment, clean shutdown
+INDEX_HEADER = struct.Struct('<4sIQII')
+# Index entry for sequence n (at n - 1): segment, offset, record length
+INDEX_ENTRY = struct.Struct('<IQI')
+
+INDEX_MAGIC = b'PCMI'
+INDEX_VERSION = 1
+INDEX_INITIAL_CAPACITY = 4096
+
+TOMBSTONE = 0x80000000  # Record header: record deletes the given sequence
+DELETED = 0x80000000    # Index entry: message deleted (length 0 once compacted away)
+
+
+class ConversationLog:
+    """Segment files and memory-mapped index of one conversation"""
+
+    def __init__(self, path, segment_size):
+        """
+        Open (or create) a conversation log
+
+        Args:
+            path: Conversation directory
+            segment_size: Roll over to a new segment past this many bytes
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.segment_size = segment_size
+        self.lock = threading.Lock()
+
+        self._fds = {}    # segment number -> file descriptor
+        self._sizes = {}  # segment number -> bytes written
+        self._dead = {}   # segment number -> bytes held by deleted messages
+
+        for name in sorted(os.listdir(path)):
+            if name.endswith('.seg'):
+                self._open_segment(int(name[:-4]))
+
+        self._index_fd = os.open(os.path.join(path, 'index'), os.O_RDWR | os.O_CREAT, 0o644)
+        minimum = INDEX_HEADER.size + INDEX_ENTRY.size * INDEX_INITIAL_CAPACITY
+        if os.fstat(self._index_fd).st_size < minimum:
+            os.ftruncate(self._index_fd, minimum)
+        self._index = mmap.mmap(self._index_fd, 0)
+
+        magic, version, count, active, clean = INDEX_HEADER.unpack_from(self._index)
+        if magic == INDEX_MAGIC and version == INDEX_VERSION and clean and active in self._fds:
+            self.count = count
+            self.active = active
+            self._load_dead_bytes()
+        else:
+            if magic == INDEX_MAGIC:
+                logger.warning(f"Message log {path} was not closed cleanly, rebuilding index")
+            self._rebuild()
+
+        # Cleared again by close(); a crash leaves it unset and forces a rebuild
+        self._write_header(clean=0)
+
+    @property
+    def capacity(self):
+        return (len(self._index) - INDEX_HEADER.size) // INDEX_ENTRY.size
+
+    def _segment_path(self, number):
+        return os.path.join(self.path, f'{number:08d}.seg')
+
+    def _open_segment(self, number):
+        fd = os.open(self._segment_path(number), os.O_RDWR | os.O_CREAT, 0o644)
+        self._fds[number] = fd
+        self._sizes[number] = os.fstat(fd).st_size
+        self._dead.setdefault(number, 0)
+
+    def _write_header(self, clean):
+        INDEX_HEADER.pack_into(self._index, 0, INDEX_MAGIC, INDEX_VERSION,
+                               self.count, self.active, clean)
+
+    def _ensure_capacity(self, count):
+        if count <= self.capacity:
+            return
+        capacity = max(self.capacity * 2, count)
+        self._index.close()
+        os.ftruncate(self._index_fd, INDEX_HEADER.size + INDEX_ENTRY.size * capacity)
+        self._index = mmap.mmap(self._index_fd, 0)
+
+    def _entry(self, seq):
+        """Index entry (segment, offset, length) of a sequence, or None"""
+        if seq < 1 or seq > self.count:
+            return None
+        return INDEX_ENTRY.unpack_from(self._index, INDEX_HEADER.size + (seq - 1) * INDEX_ENTRY.size)
+
+    def _set_entry(self, seq, segment, offset, length):
+        INDEX_ENTRY.pack_into(self._index, INDEX_HEADER.size + (seq - 1) * INDEX_ENTRY.size,
+                              segment, offset, length)
+
+    def _load_dead_bytes(self):
+        start = INDEX_HEADER.size
+        end = start + self.count * INDEX_ENTRY.size
+        for segment, _, length in INDEX_ENTRY.iter_unpack(self._index[start:end]):
+            if length & DELETED and length != DELETED:
+                self._dead[segment] = self._dead.get(segment, 0) + (length & ~DELETED)
+
+    def _rebuild(self):
+        """Rebuild the index by scanning every segment, truncating torn tails"""
+        if not self._fds:
+            self._open_segment(0)
+
+        entries = {}
+        deleted = set()
+        for number in sorted(self._fds):
+            fd = self._fds[number]
+            data = os.pread(fd, self._sizes[number], 0)
+            offset = 0
+            while offset + RECORD_HEADER.size <= len(data):
+                length, seq, crc = RECORD_HEADER.unpack_from(data, offset)
+                end = offset + RECORD_HEADER.size + (length & ~TOMBSTONE)
+                if end > len(data) or zlib.crc32(data[offset + RECORD_HEADER.size:end]) != crc:
+                    break
+                if length & TOMBSTONE:
+                    deleted.add(seq)
+                else:
+                    entries[seq] = (number, offset, end - offset)
+                offset = end
+
+            if offset < len(data):
+                logger.warning(f"Truncating {len(data) - offset} unreadable bytes "
+                               f"from {self._segment_path(number)}")
+                os.ftruncate(fd, offset)
+                self._sizes[number] = offset
+
+        self.count = max(list(entries) + list(deleted), default=0)
+        self.active = max(self._fds)
+        self._dead = dict.fromkeys(self._fds, 0)
+        self._ensure_capacity(self.count)
+
+        for seq in range(1, self.count + 1):
+            entry = entries.get(seq)
+            if entry is None:
+                # Removed by an earlier compaction
+                self._set_entry(seq, 0, 0, DELETED)
+            elif seq in deleted:
+                self._set_entry(seq, entry[0], entry[1], entry[2] | DELETED)
+                self._dead[entry[0]] += entry[2]
+            else:
+                self._set_entry(seq, *entry)
+
+        logger.info(f"Rebuilt message log index {self.path}: {self.count} sequences")
+
+    def _write_record(self, seq, payload, flags=0):
+        """Append a record to the active segment and return (segment, offset, length)"""
+        record = RECORD_HEADER.pack(len(payload) | flags, seq, zlib.crc32(payload)) + payload
+        if self._sizes[self.active] and self._sizes[self.active] + len(record) > self.segment_size:
+            self.active += 1
+            self._open_segment(self.active)
+
+        offset = self._sizes[self.active]
+        os.pwrite(self._fds[self.active], record, offset)
+        self._sizes[self.active] += len(record)
+        return self.active, offset, len(record)
+
+    def _decode(self, seq, record):
+        length, stored_seq, crc = RECORD_HEADER.unpack_from(record)
+        payload = record[RECORD_HEADER.size:]
+        if stored_seq != seq or zlib.crc32(payload) != crc:
+            logger.error(f"Corrupt record for sequence {seq} in {self.path}")
+            return None
+        return payload
+
+    def append(self, payload):
+        """
+        Append a message
+
+        Args:
+            payload: Encoded message bytes
+
+        Returns:
+            Sequence number of the message
+        """
+        with self.lock:
+            seq = self.count + 1
+            segment, offset, length = self._write_record(seq, payload)
+            self._ensure_capacity(seq)
+            self._set_entry(seq, segment, offset, length)
+            self.count = seq
+            self._write_header(clean=0)
+            return seq
+
+    def append_many(self, payloads):
+        """
+        Append several messages under one lock and one header update
+
+        Args:
+            payloads: List of encoded message bytes
+
+        Returns:
+            List of sequence numbers
+        """
+        with self.lock:
+            first = self.count + 1
+            self._ensure_capacity(self.count + len(payloads))
+            for seq, payload in enumerate(payloads, first):
+                segment, offset, length = self._write_record(seq, payload)
+                self._set_entry(seq, segment, offset, length)
+            self.count += len(payloads)
+            self._write_header(clean=0)
+            return list(range(first, self.count + 1))
+
+    def get(self, seq):
+        """
+        Read one message
+
+        Args:
+            seq: Sequence number
+
+        Returns:
+            Payload bytes, or None if missing or deleted
+        """
+        with self.lock:
+            entry = self._entry(seq)
+            if entry is None or entry[2] & DELETED:
+                return None
+            segment, offset, length = entry
+            return self._decode(seq, os.pread(self._fds[segment], length, offset))
+
+    def history(self, before=None, limit=50):
+        """
+        Read messages backwards from a sequence
+
+        Args:
+            before: Only return sequences lower than this (None for the latest)
+            limit: Maximum number of messages
+
+        Returns:
+            List of (sequence, payload bytes), newest first
+        """
+        with self.lock:
+            seq = self.count if before is None else min(before - 1, self.count)
+            results = []
+
+            while seq >= 1 and len(results) < limit:
+                low = max(1, seq - (limit - len(results)) + 1)
+                start = INDEX_HEADER.size + (low - 1) * INDEX_ENTRY.size
+                end = INDEX_HEADER.size + seq * INDEX_ENTRY.size
+                live = [
+                    (low + i, segment, offset, length)
+                    for i, (segment, offset, length)
+                    in enumerate(INDEX_ENTRY.iter_unpack(self._index[start:end]))
+                    if not length & DELETED
+                ]
+
+                # Records of consecutive sequences are adjacent within a
+                # segment, so each segment's run is read with one pread
+                runs = []
+                for item in live:
+                    if runs and runs[-1][0][1] == item[1]:
+                        runs[-1].append(item)
+                    else:
+                        runs.append([item])
+
+                for run in reversed(runs):
+                    segment = run[0][1]
+                    base = run[0][2]
+                    data = os.pread(self._fds[segment], run[-1][2] + run[-1][3] - base, base)
+                    for item_seq, _, offset, length in reversed(run):
+                        payload = self._decode(item_seq, data[offset - base:offset - base + length])
+                        if payload is not None:
+                            results.append((item_seq, payload))
+
+                seq = low - 1
+
+            return results
+
+    def delete(self, seq):
+        """
+        Delete a message by appending a tombstone
+
+        Args:
+            seq: Sequence number
+
+        Returns:
+            True if the message existed and was deleted
+        """
+        with self.lock:
+            entry = self._entry(seq)
+            if entry is None or entry[2] & DELETED:
+                return False
+            self._write_record(seq, b'', flags=TOMBSTONE)
+            segment, offset, length = entry
+            self._set_entry(seq, segment, offset, length | DELETED)
+            self._dead[segment] += length
+            return True
+
+    def compact(self, ratio):
+        """
+        Rewrite sealed segments whose share of deleted bytes exceeds a ratio
+
+        Args:
+            ratio: Dead bytes / segment size threshold (0-1)
+
+        Returns:
+            Number of bytes reclaimed
+        """
+        with self.lock:
+            reclaimed = 0
+            for number in sorted(self._fds):
+                size = self._sizes[number]
+                if number == self.active or not size or self._dead[number] / size < ratio:
+                    continue
+                reclaimed += self._compact_segment(number)
+            return reclaimed
+
+    def _compact_segment(self, number):
+        path = self._segment_path(number)
+        data = os.pread(self._fds[number], self._sizes[number], 0)
+        output = bytearray()
+        moved = []
+        purged = []
+
+        offset = 0
+        while offset < len(data):
+            length, seq, _ = RECORD_HEADER.unpack_from(data, offset)
+            end = offset + RECORD_HEADER.size + (length & ~TOMBSTONE)
+            entry = self._entry(seq)
+
+            if length & TOMBSTONE:
+                # Keep the tombstone until the deleted record itself is gone
+                keep = entry is not None and entry[2] != DELETED
+            elif entry is not None and entry[0] == number and entry[1] == offset:
+                keep = not entry[2] & DELETED
+                if not keep:
+                    purged.append(seq)
+            else:
+                keep = False
+
+            if keep:
+                if not length & TOMBSTONE:
+                    moved.append((seq, len(output), end - offset))
+                output += data[offset:end]
+            offset = end
+
+        os.close(self._fds.pop(number))
+        if output:
+            temp_path = path + '.compact'
+            with open(temp_path, 'wb') as f:
+                f.write(output)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+            self._open_segment(number)
+        else:
+            os.remove(path)
+            del self._sizes[number]
+            del self._dead[number]
+
+        for seq, new_offset, length in moved:
+            self._set_entry(seq, number, new_offset, length)
+        for seq in purged:
+            self._set_entry(seq, 0, 0, DELETED)
+        if output:
+            self._dead[number] = 0
+
+        logger.info(f"Compacted {path}: {len(data)} -> {len(output)} bytes")
+        return len(data) - len(output)
+
+    def flush(self):
+        """Force segments and index to disk"""
+        with self.lock:
+            for fd in self._fds.values():
+                os.fsync(fd)
+            self._index.flush()
+
+    def close(self):
+        """Flush and close the log, marking the index as cleanly shut down"""
+        with self.lock:
+            for fd in self._fds.values():
+                os.fsync(fd)
+                os.close(fd)
+            self._fds.clear()
+            self._write_header(clean=1)
+            self._index.flush()
+            self._index.close()
+            os.close(self._index_fd)
+
+
+class LogStructuredEngine(StorageEngine):
+    """Message storage in append-only per-conversation segment files"""
+
+    name = 'log'
+
+    def __init__(self, log_dir, segment_size, compact_ratio, max_open):
+        """
+        Args:
+            log_dir: Root directory of the conversation logs
+            segment_size: Segment roll-over size in bytes
+            compact_ratio: Dead-byte ratio at which a sealed segment is compacted
+            max_open: Number of conversation logs kept open
+        """
+        self.log_dir = log_dir
+        self.segment_size = segment_size
+        self.compact_ratio = compact_ratio
+        self.max_open = max_open
+        self._logs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _log(self, conversation_id, create=True):
+        """
+        Open conversation log, evicting the least recently used past max_open
+
+        Args:
+            conversation_id: Conversation ID
+            create: Create the log if the conversation has none yet; reads pass
+                    False so unknown ids never create files
+
+        Returns:
+            ConversationLog, or None if it does not exist and create is False
+        """
+        key = hashlib.blake2b(str(conversation_id).encode('utf-8'), digest_size=16).hexdigest()
+        with self._lock:
+            log = self._logs.get(key)
+            if log is not None:
+                self._logs.move_to_end(key)
+                return log
+
+            path = os.path.join(self.log_dir, key)
+            if not create and not os.path.isdir(path):
+                return None
+
+            log = self._logs[key] = ConversationLog(path, self.segment_size)
+            if len(self._logs) > self.max_open:
+                _, evicted = self._logs.popitem(last=False)
+                evicted.close()
+            return log
+
+    @staticmethod
+    def _to_message(conversation_id, seq, payload):
+        sender_id, recipient_id, content, created_at = json.loads(payload)
+        return {
+            'id': seq,
+            'conversation_id': conversation_id,
+            'sender_id': sender_id,
+            'recipient_id': recipient_id,
+            'content': content,
+            'created_at': datetime.fromisoformat(created_at),
+        }
+
+    @staticmethod
+    def _encode(sender_id, content, recipient_id):
+        created_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        return json.dumps([sender_id, recipient_id, content, created_at],
+                          separators=(',', ':')).encode('utf-8')
+
+    def append(self, conversation_id, sender_id, content, recipient_id=None):
+        return self._log(conversation_id).append(self._encode(sender_id, content, recipient_id))
+
+    def append_many(self, messages):
+        # One locked write sequence per conversation
+        positions = {}
+        for position, (conversation_id, sender_id, content, recipient_id) in enumerate(messages):
+            positions.setdefault(conversation_id, []).append(
+                (position, self._encode(sender_id, content, recipient_id))
+            )
+
+        message_ids = [None] * len(messages)
+        for conversation_id, entries in positions.items():
+            seqs = self._log(conversation_id).append_many([payload for _, payload in entries])
+            for (position, _), seq in zip(entries, seqs):
+                message_ids[position] = seq
+        return message_ids
+
+    def get_message(self, conversation_id, message_id):
+        log = self._log(conversation_id, create=False)
+        payload = None if log is None else log.get(message_id)
+        return None if payload is None else self._to_message(conversation_id, message_id, payload)
+
+    def get_history(self, conversation_id, before=None, limit=50):
+        log = self._log(conversation_id, create=False)
+        if log is None:
+            return []
+        return [
+            self._to_message(conversation_id, seq, payload)
+            for seq, payload in log.history(before, limit)
+        ]
+
+    def delete(self, conversation_id, message_id):
+        log = self._log(conversation_id, create=False)
+        return log is not None and log.delete(message_id)
+
+    def compact(self):
+        # Only open logs: deletes always go through an open log
+        with self._lock:
+            logs = list(self._logs.values())
+        return sum(log.compact(self.compact_ratio) for log in logs)
+
+    def flush(self):
+        with self._lock:
+            logs = list(self._logs.values())
+        for log in logs:
+            log.flush()
+
+    def close(self):
+        with self._lock:
+            while self._logs:
+                _, log = self._logs.popitem()
+                log.close()
@@ -0,0 +1,201 @@
+"""
+Memory Introspection Service
+Reports process RSS, per-connection footprint and tracemalloc allocation sites
+"""
+
+import gc
+import os
+import resource
+import sys
+import tracemalloc
+
+# RSS recorded when the service is initialized, before any client connects
+_baseline_rss = None
+
+# Snapshots kept for diffing: the previous and the latest one
+_snapshots = {'previous': None, 'latest': None}
+
+
+def get_rss():
+    """
+    Get the current resident set size of the process
+
+    Returns:
+        RSS in bytes
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Not Linux: fall back to peak RSS (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def init_memory(app):
+    """
+    Record the baseline RSS and optionally start tracemalloc
+
+    Args:
+        app: Flask application instance
+    """
+    global _baseline_rss
+    _baseline_rss = get_rss()
+
+    if app.config['MEMORY_TRACEMALLOC_ON_START'] and not tracemalloc.is_tracing():
+        tracemalloc.start(app.config['MEMORY_TRACEMALLOC_FRAMES'])
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Approximate the memory held by an object and everything it references
+
+    Follows containers and instance __dict__/__slots__; modules, classes and
+    functions are not followed.
+
+    Args:
+        obj: Object to measure
+        seen: Set of already counted object ids
+
+    Returns:
+        Size in bytes
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, (type, type(sys), type(deep_sizeof))):
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    elif hasattr(obj, '__slots__'):
+        size += sum(deep_sizeof(getattr(obj, name), seen)
+                    for name in obj.__slots__ if hasattr(obj, name))
+    return size
+
+
+def connection_footprint(connected_clients, eio_sockets):
+    """
+    Estimate the memory cost of connected clients
+
+    Args:
+        connected_clients: Registry of connected clients
+        eio_sockets: Engine.IO session objects keyed by Engine.IO sid
+
+    Returns:
+        Dict with the client count, RSS growth since startup per client and
+        the measured size of registry entries and Engine.IO sessions
+    """
+    count = len(connected_clients)
+    rss = get_rss()
+
+    registry_bytes = sum(deep_sizeof(entry) for entry in list(connected_clients.values()))
+    # Engine.IO sessions hold the packet queue and buffered packets; they
+    # reference the server, which is shared, so count it once up front
+    seen = set()
+    for eio_socket in list(eio_sockets.values()):
+        seen.add(id(eio_socket.server))
+    session_bytes = sum(deep_sizeof(s, seen) for s in list(eio_sockets.values()))
+
+    return {
+        'connections': count,
+        'rss_growth_bytes': rss - _baseline_rss if _baseline_rss is not None else None,
+        'rss_growth_per_connection': (
+            (rss - _baseline_rss) // count if count and _baseline_rss is not None else None
+        ),
+        'registry_bytes': registry_bytes,
+        'session_bytes': session_bytes,
+        'measured_bytes_per_connection': (registry_bytes + session_bytes) // count if count else None,
+    }
+
+
+def get_memory_report(connected_clients, eio_sockets):
+    """
+    Build the memory overview report
+
+    Args:
+        connected_clients: Registry of connected clients
+        eio_sockets: Engine.IO session objects keyed by Engine.IO sid
+
+    Returns:
+        JSON-serializable dict
+    """
+    report = {
+        'rss_bytes': get_rss(),
+        'baseline_rss_bytes': _baseline_rss,
+        'gc_objects': len(gc.get_objects()),
+        'gc_counts': gc.get_count(),
+        'tracemalloc': tracemalloc.is_tracing(),
+        'per_connection': connection_footprint(connected_clients, eio_sockets),
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        report['traced_bytes'] = current
+        report['traced_peak_bytes'] = peak
+    return report
+
+
+def _format_stat(stat):
+    """Convert a tracemalloc Statistic/StatisticDiff into a dict"""
+    frame = stat.traceback[0]
+    result = {
+        'file': frame.filename,
+        'line': frame.lineno,
+        'size_bytes': stat.size,
+        'count': stat.count,
+    }
+    if hasattr(stat, 'size_diff'):
+        result['size_diff_bytes'] = stat.size_diff
+        result['count_diff'] = stat.count_diff
+    return result
+
+
+def take_snapshot(top=20, frames=1):
+    """
+    Take a tracemalloc snapshot and diff it against the previous one
+
+    Starts tracing on the first call; allocations are only visible in
+    snapshots taken after tracing started.
+
+    Args:
+        top: Number of allocation sites to report
+        frames: Traceback depth used if tracing has to be started
+
+    Returns:
+        Dict with top allocation sites and the diff against the previous snapshot
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ))
+
+    _snapshots['previous'], _snapshots['latest'] = _snapshots['latest'], snapshot
+
+    result = {
+        'traced_bytes': tracemalloc.get_traced_memory()[0],
+        'top': [_format_stat(stat) for stat in snapshot.statistics('lineno')[:top]],
+        'diff': None,
+    }
+    if _snapshots['previous'] is not None:
+        diff = snapshot.compare_to(_snapshots['previous'], 'lineno')
+        result['diff'] = [_format_stat(stat) for stat in diff[:top]]
+    return result
+
+
+def stop_tracing():
+    """
+    Stop tracemalloc and drop stored snapshots
+    """
+    _snapshots['previous'] = _snapshots['latest'] = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
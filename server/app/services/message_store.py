@@ -0,0 +1,253 @@
+"""
+Message Store
+Pluggable storage engines for chat messages
+
+MESSAGE_STORE_ENGINE selects the engine:
+- 'sqlite' (default): rows in the messages table through db_service
+- 'log': append-only per-conversation segment files (see log_store)
+
+Both engines expose the same methods. Message ids increase within a
+conversation: the log engine numbers each conversation from 1, while SQLite
+uses the table's row id.
+"""
+
+import atexit
+import logging
+from abc import ABC, abstractmethod
+from app.services import drain_service
+from app.services.db_service import execute_query, get_db
+
+logger = logging.getLogger(__name__)
+
+# Active engine, set by init_message_store
+_engine = None
+
+
+class StorageEngine(ABC):
+    """Interface implemented by message storage engines"""
+
+    name = None
+
+    @abstractmethod
+    def append(self, conversation_id, sender_id, content, recipient_id=None):
+        """
+        Store a message
+
+        Args:
+            conversation_id: Conversation the message belongs to
+            sender_id: Sender's user ID
+            content: Message text
+            recipient_id: Recipient's user ID for direct messages
+
+        Returns:
+            Message ID
+        """
+
+    def append_many(self, messages):
+        """
+        Store several messages in one write
+
+        Engines override this to commit the whole batch at once; the default
+        appends them one by one.
+
+        Args:
+            messages: List of (conversation_id, sender_id, content, recipient_id) tuples
+
+        Returns:
+            List of message IDs, in the order of messages
+        """
+        return [self.append(*message) for message in messages]
+
+    @abstractmethod
+    def get_message(self, conversation_id, message_id):
+        """
+        Get a single message
+
+        Args:
+            conversation_id: Conversation ID
+            message_id: Message ID
+
+        Returns:
+            Message dict or None
+        """
+
+    @abstractmethod
+    def get_history(self, conversation_id, before=None, limit=50):
+        """
+        Get a page of conversation history, newest first
+
+        Args:
+            conversation_id: Conversation ID
+            before: Only return messages with a lower ID (None for the latest)
+            limit: Maximum number of messages
+
+        Returns:
+            List of message dicts
+        """
+
+    @abstractmethod
+    def delete(self, conversation_id, message_id):
+        """
+        Delete a message
+
+        Args:
+            conversation_id: Conversation ID
+            message_id: Message ID
+
+        Returns:
+            True if the message existed
+        """
+
+    def compact(self):
+        """
+        Reclaim space held by deleted messages
+
+        Returns:
+            Number of bytes reclaimed
+        """
+        return 0
+
+    def flush(self):
+        """Force pending writes to disk"""
+
+    def close(self):
+        """Flush and release resources"""
+
+
+class SQLiteEngine(StorageEngine):
+    """Message storage in the SQLite messages table (needs an app context)"""
+
+    name = 'sqlite'
+
+    def append(self, conversation_id, sender_id, content, recipient_id=None):
+        query = """
+            INSERT INTO messages (sender_id, recipient_id, content, conversation_id)
+            VALUES (?, ?, ?, ?)
+        """
+        return execute_query(query, (sender_id, recipient_id, content, conversation_id))
+
+    def append_many(self, messages):
+        # One transaction and one commit; executemany would not report the
+        # row id of each insert
+        query = """
+            INSERT INTO messages (sender_id, recipient_id, content, conversation_id)
+            VALUES (?, ?, ?, ?)
+        """
+        db = get_db()
+        with db:
+            cursor = db.cursor()
+            message_ids = []
+            for conversation_id, sender_id, content, recipient_id in messages:
+                cursor.execute(query, (sender_id, recipient_id, content, conversation_id))
+                message_ids.append(cursor.lastrowid)
+        return message_ids
+
+    def get_message(self, conversation_id, message_id):
+        query = "SELECT * FROM messages WHERE conversation_id = ? AND id = ?"
+        return execute_query(query, (conversation_id, message_id), fetch_one=True)
+
+    def get_history(self, conversation_id, before=None, limit=50):
+        if before is None:
+            query = "SELECT * FROM messages WHERE conversation_id = ? ORDER BY id DESC LIMIT ?"
+            params = (conversation_id, limit)
+        else:
+            query = """
+                SELECT * FROM messages
+                WHERE conversation_id = ? AND id < ?
+                ORDER BY id DESC LIMIT ?
+            """
+            params = (conversation_id, before, limit)
+        return execute_query(query, params, fetch_all=True)
+
+    def delete(self, conversation_id, message_id):
+        if self.get_message(conversation_id, message_id) is None:
+            return False
+        execute_query("DELETE FROM messages WHERE id = ?", (message_id,))
+        return True
+
+
+def create_engine(config):
+    """
+    Build the storage engine selected by MESSAGE_STORE_ENGINE
+
+    Args:
+        config: Flask config
+
+    Returns:
+        StorageEngine instance
+    """
+    name = config['MESSAGE_STORE_ENGINE']
+    if name == SQLiteEngine.name:
+        return SQLiteEngine()
+    if name == 'log':
+        from app.services.log_store import LogStructuredEngine
+        return LogStructuredEngine(
+            config['MESSAGE_LOG_DIR'],
+            config['MESSAGE_LOG_SEGMENT_SIZE'],
+            config['MESSAGE_LOG_COMPACT_RATIO'],
+            config['MESSAGE_LOG_MAX_OPEN'],
+        )
+    raise ValueError(f"Unknown MESSAGE_STORE_ENGINE: {name}")
+
+
+def init_message_store(app, socketio):
+    """
+    Create the configured engine and start its background compaction
+
+    Args:
+        app: Flask application instance
+        socketio: SocketIO instance
+    """
+    global _engine
+    if _engine is not None:
+        _engine.close()
+
+    engine = _engine = create_engine(app.config)
+    app.logger.info(f"Message store engine: {engine.name}")
+
+    interval = app.config['MESSAGE_LOG_COMPACT_INTERVAL']
+    if engine.name != SQLiteEngine.name and interval:
+        def compact_loop():
+            # Stops once a newer app replaced this engine
+            while _engine is engine:
+                socketio.sleep(interval)
+                try:
+                    reclaimed = engine.compact()
+                    if reclaimed:
+                        logger.info(f"Message store compaction reclaimed {reclaimed} bytes")
+                except Exception as e:
+                    logger.error(f"Message store compaction failed: {str(e)}", exc_info=True)
+
+        socketio.start_background_task(compact_loop)
+
+    drain_service.register_flush_hook(flush_message_store)
+
+
+def get_message_store():
+    """
+    Get the active storage engine
+
+    Returns:
+        StorageEngine instance
+    """
+    return _engine
+
+
+def flush_message_store(app=None):
+    """
+    Force pending message writes to disk (drain flush hook)
+
+    Args:
+        app: Flask application instance (unused)
+    """
+    if _engine is not None:
+        _engine.flush()
+
+
+@atexit.register
+def close_message_store():
+    """Close the active engine so the next start skips recovery"""
+    global _engine
+    if _engine is not None:
+        _engine.close()
+        _engine = None
@@ -0,0 +1,273 @@
+"""
+Presence Service
+Tracks online/idle/away/offline status for every connection
+
+Each event only stamps the connection's last activity time (O(1)). A single
+timer wheel holds one timer per connection for its next possible status
+change; when a timer fires the real idle time is checked and the timer is
+rescheduled from the last activity, so busy connections never touch the wheel.
+Status transitions and last_seen updates are collected and handed out once
+per tick, in batches. Transitions are only delivered to the clients watching
+the connection (see watch()), so a tick costs O(interest), not O(connections).
+"""
+
+import time
+
+from app.utils.timer_wheel import TimerWheel
+
+ONLINE = 'online'
+IDLE = 'idle'
+AWAY = 'away'
+OFFLINE = 'offline'
+
+# Presence per connection
+# Structure: {client_id: {'status': str, 'last_activity': float, 'user_id': int or None}}
+presence = {}
+
+# Connections per authenticated user
+# Structure: {user_id: set(client_id)}
+user_connections = {}
+
+# Presence subscriptions
+# Structure: {watcher_client_id: set(client_id)} and the reverse
+# {client_id: set(watcher_client_id)}
+watching = {}
+watchers = {}
+
+# Precedence used when a user has several connections
+_STATUS_RANK = {ONLINE: 0, IDLE: 1, AWAY: 2, OFFLINE: 3}
+
+_wheel = None
+_thresholds = []  # [(seconds_inactive, status)] in ascending order
+_pending_transitions = []
+_dirty_users = set()
+_ticker = None
+
+
+def _status_for(inactive):
+    """Map seconds of inactivity to a presence status"""
+    status = ONLINE
+    for after, candidate in _thresholds:
+        if inactive >= after:
+            status = candidate
+    return status
+
+
+def _schedule_next(client_id, entry, inactive):
+    """Schedule the connection's next possible status change"""
+    for after, _ in _thresholds:
+        if inactive < after:
+            _wheel.schedule(client_id, entry['last_activity'] + after)
+            return
+    _wheel.cancel(client_id)
+
+
+def register(client_id, user_id=None):
+    """
+    Start tracking a connection
+
+    Args:
+        client_id: Socket id of the connection
+        user_id: Authenticated user id, if known
+    """
+    now = time.monotonic()
+    entry = {'status': ONLINE, 'last_activity': now, 'user_id': user_id}
+    presence[client_id] = entry
+    _pending_transitions.append((client_id, ONLINE))
+    if user_id is not None:
+        _dirty_users.add(user_id)
+        user_connections.setdefault(user_id, set()).add(client_id)
+    _schedule_next(client_id, entry, 0)
+
+
+def touch(client_id):
+    """
+    Record activity on a connection
+
+    Args:
+        client_id: Socket id of the connection
+    """
+    entry = presence.get(client_id)
+    if entry is None:
+        return
+
+    entry['last_activity'] = time.monotonic()
+    if entry['user_id'] is not None:
+        _dirty_users.add(entry['user_id'])
+
+    if entry['status'] != ONLINE:
+        entry['status'] = ONLINE
+        _pending_transitions.append((client_id, ONLINE))
+        _schedule_next(client_id, entry, 0)
+
+
+def unregister(client_id):
+    """
+    Stop tracking a connection
+
+    Args:
+        client_id: Socket id of the connection
+    """
+    entry = presence.pop(client_id, None)
+    if entry is None:
+        return
+
+    unwatch(client_id)
+    _wheel.cancel(client_id)
+    _pending_transitions.append((client_id, OFFLINE))
+    user_id = entry['user_id']
+    if user_id is not None:
+        _dirty_users.add(user_id)
+        connections = user_connections.get(user_id)
+        if connections is not None:
+            connections.discard(client_id)
+            if not connections:
+                del user_connections[user_id]
+
+
+def watch(watcher, client_ids):
+    """
+    Replace the set of connections a client receives presence updates for
+
+    Args:
+        watcher: Socket id of the subscribing client
+        client_ids: Socket ids to watch
+
+    Returns:
+        List of (client_id, status) with the current status of each
+    """
+    unwatch(watcher)
+    targets = set(client_ids)
+    if targets:
+        watching[watcher] = targets
+        for client_id in targets:
+            watchers.setdefault(client_id, set()).add(watcher)
+    return [(client_id, get_status(client_id)) for client_id in targets]
+
+
+def unwatch(watcher):
+    """
+    Drop all presence subscriptions of a client
+
+    Args:
+        watcher: Socket id of the subscribing client
+    """
+    for client_id in watching.pop(watcher, ()):
+        subscribers = watchers.get(client_id)
+        if subscribers is not None:
+            subscribers.discard(watcher)
+            if not subscribers:
+                del watchers[client_id]
+
+
+def route(transitions):
+    """
+    Group transitions by the clients watching them
+
+    Args:
+        transitions: List of (client_id, status)
+
+    Returns:
+        Dict {watcher_client_id: [(client_id, status), ...]}
+    """
+    updates = {}
+    for client_id, status in transitions:
+        for watcher in watchers.get(client_id, ()):
+            updates.setdefault(watcher, []).append((client_id, status))
+    return updates
+
+
+def get_status(client_id):
+    """
+    Get the presence status of a connection
+
+    Args:
+        client_id: Socket id of the connection
+
+    Returns:
+        Status string (offline for unknown connections)
+    """
+    entry = presence.get(client_id)
+    return entry['status'] if entry else OFFLINE
+
+
+def get_user_status(user_id):
+    """
+    Get the presence status of a user across all their connections
+
+    Args:
+        user_id: User's ID
+
+    Returns:
+        Most present status of any connection (offline if none)
+    """
+    statuses = [presence[client_id]['status'] for client_id in user_connections.get(user_id, ())
+                if client_id in presence]
+    return min(statuses, key=_STATUS_RANK.get) if statuses else OFFLINE
+
+
+def tick(now=None):
+    """
+    Fire due timers and collect the batch of changes since the last tick
+
+    Args:
+        now: Monotonic timestamp (defaults to now)
+
+    Returns:
+        Tuple (transitions, user_ids): list of (client_id, status) changes
+        and set of user ids whose last_seen must be flushed
+    """
+    global _pending_transitions, _dirty_users
+    if _wheel is None:
+        # Ticker never started: no connection has been tracked yet
+        return [], set()
+
+    now = time.monotonic() if now is None else now
+
+    for client_id in _wheel.advance(now):
+        entry = presence.get(client_id)
+        if entry is None:
+            continue
+        inactive = now - entry['last_activity']
+        status = _status_for(inactive)
+        if status != entry['status']:
+            entry['status'] = status
+            _pending_transitions.append((client_id, status))
+        _schedule_next(client_id, entry, inactive)
+
+    # Coalesce: only the latest status per connection is reported
+    transitions = list(dict(_pending_transitions).items())
+    _pending_transitions = []
+    user_ids, _dirty_users = _dirty_users, set()
+    return transitions, user_ids
+
+
+def start_ticker(socketio, config, on_tick):
+    """
+    Start the single background task that turns the presence wheel
+
+    Args:
+        socketio: SocketIO instance used to run the background task
+        config: Application config with PRESENCE_* settings
+        on_tick: Callback receiving (transitions, user_ids) when either is non-empty
+    """
+    global _wheel, _thresholds, _ticker
+    if _ticker is not None:
+        return
+
+    interval = config['PRESENCE_TICK']
+    _thresholds = [
+        (config['PRESENCE_IDLE_AFTER'], IDLE),
+        (config['PRESENCE_AWAY_AFTER'], AWAY),
+        (config['PRESENCE_OFFLINE_AFTER'], OFFLINE),
+    ]
+    _wheel = TimerWheel(tick=interval, start=time.monotonic())
+
+    def run():
+        while True:
+            socketio.sleep(interval)
+            transitions, user_ids = tick()
+            if transitions or user_ids:
+                on_tick(transitions, user_ids)
+
+    _ticker = socketio.start_background_task(run)
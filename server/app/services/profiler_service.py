@@ -0,0 +1,353 @@
+"""
+Profiler Service
+On-demand stack sampling and single-handler cProfile capture
+
+The sampler runs in a real OS thread (not a green thread), so it keeps
+sampling while handlers hold the event loop. Every interval it records the
+running stack of each thread from sys._current_frames() and, in 'wall' mode,
+the parked stack of every other greenlet. Stacks are attributed by inserting
+synthetic frames:
+
+    event:<name>            SocketIO event being handled (root)
+    http:<METHOD> <path>    HTTP request being served (root)
+    sql:<query>             Query passed to db_service.execute_query
+
+Results are exported as collapsed stacks (flamegraph.pl, speedscope) or the
+speedscope JSON format.
+
+The handler capture arms cProfile for the next invocation of one SocketIO
+event. Handlers opt in with the profiled() decorator, which costs a single
+check while nothing is armed.
+"""
+
+import cProfile
+import gc
+import io
+import logging
+import os
+import pstats
+import sys
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+
+try:
+    # Real OS thread and sleep even when eventlet has monkey patched them
+    from eventlet.patcher import original
+    _threading = original('threading')
+    _time = original('time')
+except ImportError:
+    import threading as _threading
+    import time as _time
+
+try:
+    import greenlet
+except ImportError:
+    greenlet = None
+
+logger = logging.getLogger(__name__)
+
+CPU = 'cpu'
+WALL = 'wall'
+
+MAX_DEPTH = 128
+
+# Prefixes of the synthetic attribution frames
+SYNTHETIC_PREFIXES = ('event:', 'http:', 'sql:')
+
+# Sampling state: one profile at a time
+_sampling = {'running': False}
+
+# Handler capture state
+_capture = {
+    'event': None,
+    'status': 'idle',  # idle, armed, running, captured
+    'captured_at': None,
+    'elapsed_ms': None,
+    'stats': None,
+}
+
+# code object -> frame label
+_labels = {}
+
+_path_prefixes = sorted({os.path.abspath(p) + os.sep for p in sys.path if p}, key=len, reverse=True)
+
+
+def _label(code):
+    """Readable 'function (file:line)' label of a code object"""
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        for prefix in _path_prefixes:
+            if filename.startswith(prefix):
+                filename = filename[len(prefix):]
+                break
+        label = _labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+    return label
+
+
+def _attribution(frame):
+    """Synthetic frame for event, request and query frames, or None"""
+    name = frame.f_code.co_name
+    if name == '_handle_event' and 'flask_socketio' in frame.f_code.co_filename:
+        return f"event:{frame.f_locals.get('message')}"
+    if name == 'wsgi_app' and 'flask' in frame.f_code.co_filename:
+        environ = frame.f_locals.get('environ') or {}
+        return f"http:{environ.get('REQUEST_METHOD')} {environ.get('PATH_INFO')}"
+    if name == 'execute_query' and frame.f_code.co_filename.endswith('db_service.py'):
+        query = ' '.join(str(frame.f_locals.get('query', '')).split())
+        return f"sql:{query[:100]}"
+    return None
+
+
+def _walk(frame):
+    """
+    Build a root-to-leaf stack of labels for a frame
+
+    Returns:
+        Tuple of labels, rooted at the event/request label when there is one
+    """
+    labels = []
+    root = None
+    depth = 0
+    while frame is not None and depth < MAX_DEPTH:
+        synthetic = _attribution(frame)
+        if synthetic is not None:
+            if synthetic.startswith('sql:'):
+                labels.append(synthetic)
+            elif root is None:
+                root = synthetic
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+        depth += 1
+
+    labels.reverse()
+    if root is not None:
+        labels.insert(0, root)
+    return tuple(labels)
+
+
+def _greenlets():
+    """All live greenlets (a full gc scan, so refreshed sparingly)"""
+    if greenlet is None:
+        return []
+    return [obj for obj in gc.get_objects() if isinstance(obj, greenlet.greenlet)]
+
+
+def is_sampling():
+    """
+    Check whether a sampling profile is running
+
+    Returns:
+        True if running
+    """
+    return _sampling['running']
+
+
+def sample(seconds, interval, mode=CPU, sleep=None):
+    """
+    Sample the stacks of all threads (and greenlets in wall mode)
+
+    Args:
+        seconds: Profile duration
+        interval: Seconds between samples
+        mode: 'cpu' for running stacks only, 'wall' to include parked greenlets
+        sleep: Cooperative sleep used while waiting (e.g. socketio.sleep) so
+               the caller's green thread does not block the event loop
+
+    Returns:
+        Dict with 'stacks' (Counter of label tuples), 'samples', 'interval',
+        'duration' and 'mode', or None if a profile is already running
+    """
+    if _sampling['running']:
+        return None
+    _sampling['running'] = True
+
+    stacks = Counter()
+    state = {'samples': 0, 'stop': False}
+
+    def run():
+        sampler_id = _threading.get_ident()
+        greenlets = []
+        refreshed = 0.0
+        while not state['stop']:
+            now = _time.monotonic()
+            if mode == WALL and now - refreshed >= 1.0:
+                greenlets = _greenlets()
+                refreshed = now
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != sampler_id:
+                    stacks[_walk(frame)] += 1
+            for g in greenlets:
+                # Running greenlets have no gr_frame: they were sampled above
+                frame = g.gr_frame
+                if frame is not None and not g.dead:
+                    stacks[_walk(frame)] += 1
+
+            state['samples'] += 1
+            _time.sleep(interval)
+
+    started = _time.monotonic()
+    thread = _threading.Thread(target=run, name='profiler-sampler', daemon=True)
+    try:
+        thread.start()
+        (sleep or _time.sleep)(seconds)
+    finally:
+        state['stop'] = True
+        thread.join()
+        _sampling['running'] = False
+
+    return {
+        'stacks': stacks,
+        'samples': state['samples'],
+        'interval': interval,
+        'duration': _time.monotonic() - started,
+        'mode': mode,
+    }
+
+
+def to_collapsed(profile):
+    """
+    Format a profile as collapsed stacks ('frame;frame;frame count' per line)
+
+    Args:
+        profile: Result of sample()
+
+    Returns:
+        Collapsed stack text
+    """
+    return ''.join(
+        ';'.join(label.replace(';', ',') for label in stack) + f" {count}\n"
+        for stack, count in profile['stacks'].most_common()
+    )
+
+
+def to_speedscope(profile, name='py-chat'):
+    """
+    Format a profile as a speedscope sampled profile
+
+    Args:
+        profile: Result of sample()
+        name: Profile name shown by speedscope
+
+    Returns:
+        Speedscope JSON-serializable dict
+    """
+    frames = []
+    frame_index = {}
+    samples = []
+    weights = []
+
+    for stack, count in profile['stacks'].most_common():
+        indexes = []
+        for label in stack:
+            index = frame_index.get(label)
+            if index is None:
+                index = frame_index[label] = len(frames)
+                if label.startswith(SYNTHETIC_PREFIXES):
+                    frames.append({'name': label})
+                else:
+                    function, _, location = label.partition(' (')
+                    file, _, line = location.rstrip(')').rpartition(':')
+                    frames.append({'name': function, 'file': file, 'line': int(line)})
+            indexes.append(index)
+        samples.append(indexes)
+        weights.append(round(count * profile['interval'], 6))
+
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'py-chat profiler',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': f"{name} ({profile['mode']}, {profile['samples']} samples)",
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': round(profile['duration'], 6),
+            'samples': samples,
+            'weights': weights,
+        }],
+    }
+
+
+def arm_capture(event):
+    """
+    Profile the next invocation of an event handler with cProfile
+
+    Args:
+        event: SocketIO event name
+    """
+    _capture.update({
+        'event': event,
+        'status': 'armed',
+        'captured_at': None,
+        'elapsed_ms': None,
+        'stats': None,
+    })
+    logger.info(f"Handler profiling armed for '{event}'")
+
+
+def get_capture(sort='cumulative', top=30):
+    """
+    Get the handler capture state and, once captured, its statistics
+
+    Args:
+        sort: pstats sort key (e.g. 'cumulative', 'tottime', 'calls')
+        top: Number of functions to include
+
+    Returns:
+        JSON-serializable dict
+    """
+    result = {
+        'event': _capture['event'],
+        'status': _capture['status'],
+        'captured_at': _capture['captured_at'],
+        'elapsed_ms': _capture['elapsed_ms'],
+        'stats': None,
+    }
+    if _capture['stats'] is not None:
+        stream = io.StringIO()
+        pstats.Stats(_capture['stats'], stream=stream).sort_stats(sort).print_stats(top)
+        result['stats'] = stream.getvalue()
+    return result
+
+
+def profiled(event):
+    """
+    Decorator running a handler under cProfile when a capture is armed for it
+
+    Costs a single check per event while no capture is armed. Green threads
+    switched to during the handler are included in the capture.
+
+    Args:
+        event: SocketIO event name
+
+    Returns:
+        Decorator
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(*args):
+            if _capture['status'] != 'armed' or _capture['event'] != event:
+                return handler(*args)
+
+            # Disarm first so a concurrent invocation is not captured too
+            _capture['status'] = 'running'
+            profiler = cProfile.Profile()
+            started = _time.perf_counter()
+            try:
+                return profiler.runcall(handler, *args)
+            finally:
+                _capture.update({
+                    'status': 'captured',
+                    'captured_at': datetime.now().isoformat(),
+                    'elapsed_ms': round((_time.perf_counter() - started) * 1000, 3),
+                    'stats': profiler,
+                })
+                logger.info(f"Handler profile captured for '{event}'")
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,183 @@
+"""
+Traffic Recorder
+Records inbound SocketIO events to disk for deterministic replay
+
+Each line of the log is a compact JSON array:
+    [seconds_since_start, client_number, event, args]
+
+Socket ids are replaced by sequential client numbers and every string in the
+payload is replaced by a keyed hash of the same length, so message sizes and
+repeated identifiers (e.g. conversation ids) keep their shape while the
+content is anonymized. Files ending in .gz are gzip-compressed.
+
+Typing signals are never recorded (typing state is ephemeral). A background
+task flushes the log every FLUSH_INTERVAL seconds whenever events were written
+since the last flush (also when traffic has gone quiet), so a crash loses at
+most that much traffic and leaves at most one torn line, which the replay
+harness skips.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from functools import wraps
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+# Events whose handlers are never recorded
+EXCLUDED_EVENTS = frozenset({'typing'})
+
+# Seconds between flushes of the log file
+FLUSH_INTERVAL = 1.0
+
+# Recording state; 'file' is None while recording is off
+_state = {
+    'file': None,
+    'path': None,
+    'started_at': None,
+    'salt': None,
+    'clients': {},
+    'events': 0,
+    'unflushed': 0,
+}
+
+
+def is_recording():
+    """
+    Check whether traffic is being recorded
+
+    Returns:
+        True if recording
+    """
+    return _state['file'] is not None
+
+
+def start_recording(path, socketio):
+    """
+    Start recording inbound events and the task that flushes the log
+
+    Args:
+        path: Log file path (gzip-compressed if it ends in .gz)
+        socketio: SocketIO instance used to run the flush task
+    """
+    if is_recording():
+        stop_recording()
+
+    log_dir = os.path.dirname(path)
+    if log_dir and not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+
+    opener = gzip.open if path.endswith('.gz') else open
+    log_file = opener(path, 'wt', encoding='utf-8')
+    _state.update({
+        'file': log_file,
+        'path': path,
+        'started_at': time.monotonic(),
+        # Fresh key per recording: hashes cannot be correlated across logs
+        'salt': os.urandom(16),
+        'clients': {},
+        'events': 0,
+        'unflushed': 0,
+    })
+    logger.info(f"Traffic recording started: {path}")
+
+    def flush_loop():
+        # Stops once this recording is stopped or replaced
+        while True:
+            socketio.sleep(FLUSH_INTERVAL)
+            if _state['file'] is not log_file:
+                return
+            if _state['unflushed']:
+                _state['unflushed'] = 0
+                try:
+                    log_file.flush()
+                except Exception as e:
+                    logger.error(f"Traffic log flush failed: {str(e)}")
+
+    socketio.start_background_task(flush_loop)
+
+
+def stop_recording():
+    """
+    Stop recording and close the log file
+
+    Returns:
+        Number of events recorded
+    """
+    if not is_recording():
+        return 0
+
+    recorded = _state['events']
+    _state['file'].close()
+    logger.info(f"Traffic recording stopped: {_state['path']} ({recorded} events)")
+    _state.update({'file': None, 'path': None, 'clients': {}, 'salt': None})
+    return recorded
+
+
+def _anonymize(value):
+    """Replace strings with same-length keyed hashes, keeping the structure"""
+    if isinstance(value, str):
+        if not value:
+            return value
+        digest = hashlib.blake2b(value.encode('utf-8'), key=_state['salt']).hexdigest()
+        return (digest * (len(value) // len(digest) + 1))[:len(value)]
+    if isinstance(value, dict):
+        return {key: _anonymize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_anonymize(item) for item in value]
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    # Binary or other payloads: keep only the size
+    return {'_bytes': len(value)} if hasattr(value, '__len__') else None
+
+
+def _write(event, args):
+    """Append one event to the log"""
+    clients = _state['clients']
+    client_number = clients.setdefault(request.sid, len(clients))
+    if event == 'disconnect':
+        clients.pop(request.sid, None)
+
+    line = json.dumps(
+        [round(time.monotonic() - _state['started_at'], 4), client_number, event, _anonymize(list(args))],
+        separators=(',', ':'),
+    )
+    _state['file'].write(line + '\n')
+    _state['events'] += 1
+    _state['unflushed'] += 1
+
+
+def record(event):
+    """
+    Decorator recording an event handler's inbound traffic
+
+    Costs a single check per event while recording is off. Events in
+    EXCLUDED_EVENTS are left unwrapped.
+
+    Args:
+        event: SocketIO event name
+
+    Returns:
+        Decorator
+    """
+    def decorator(handler):
+        if event in EXCLUDED_EVENTS:
+            return handler
+
+        @wraps(handler)
+        def wrapper(*args):
+            if _state['file'] is not None:
+                try:
+                    _write(event, args)
+                except Exception as e:
+                    logger.error(f"Traffic recording failed, stopping: {str(e)}")
+                    stop_recording()
+            return handler(*args)
+
+        return wrapper
+
+    return decorator
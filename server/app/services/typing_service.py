@@ -0,0 +1,109 @@
+"""
+Typing Indicator Service
+Tracks ephemeral "user is typing" state per (client, conversation)
+
+State lives only in memory: nothing is persisted or logged. Clients may send
+a typing event on every keystroke; only start/stop transitions are reported
+back to the caller, so one keystroke burst produces one start and one stop.
+"""
+
+import time
+
+# Active typists
+# Structure: {(client_id, conversation_id): {'expires_at': float, 'refreshed_at': float}}
+typing_state = {}
+
+# Background sweeper green thread (started on first use)
+_sweeper = None
+
+
+def set_typing(client_id, conversation_id, typing, timeout, debounce):
+    """
+    Record a typing start/stop signal
+
+    Args:
+        client_id: Socket id of the typist
+        conversation_id: Conversation the typist is typing in
+        typing: True for a keystroke/start signal, False for an explicit stop
+        timeout: Seconds without a start signal before typing auto-expires
+        debounce: Seconds during which repeated start signals are ignored
+
+    Returns:
+        True/False if a start/stop transition must be broadcast, None otherwise
+    """
+    key = (client_id, conversation_id)
+    now = time.monotonic()
+    entry = typing_state.get(key)
+
+    if not typing:
+        if entry is None:
+            return None
+        del typing_state[key]
+        return False
+
+    if entry is None:
+        typing_state[key] = {'expires_at': now + timeout, 'refreshed_at': now}
+        return True
+
+    # Already typing: extend the expiry at most once per debounce window
+    if now - entry['refreshed_at'] >= debounce:
+        entry['expires_at'] = now + timeout
+        entry['refreshed_at'] = now
+    return None
+
+
+def clear_client(client_id):
+    """
+    Drop all typing state for a client (e.g. on disconnect)
+
+    Args:
+        client_id: Socket id of the client
+
+    Returns:
+        List of conversation ids the client was typing in
+    """
+    keys = [key for key in typing_state if key[0] == client_id]
+    for key in keys:
+        del typing_state[key]
+    return [conversation_id for _, conversation_id in keys]
+
+
+def expire_stale(now=None):
+    """
+    Remove typing state whose expiry has passed
+
+    Args:
+        now: Monotonic timestamp to compare against (defaults to now)
+
+    Returns:
+        List of (client_id, conversation_id) pairs that expired
+    """
+    now = time.monotonic() if now is None else now
+    expired = [key for key, entry in typing_state.items() if entry['expires_at'] <= now]
+    for key in expired:
+        del typing_state[key]
+    return expired
+
+
+def start_sweeper(socketio, interval, on_expired):
+    """
+    Start the single background task that expires stale typing state
+
+    Args:
+        socketio: SocketIO instance used to run the background task
+        interval: Seconds between sweeps
+        on_expired: Callback receiving the list of expired pairs
+    """
+    global _sweeper
+    if _sweeper is not None:
+        return
+
+    def sweep():
+        while True:
+            socketio.sleep(interval)
+            if typing_state:
+                expired = expire_stale()
+                if expired:
+                    on_expired(expired)
+
+    _sweeper = socketio.start_background_task(sweep)
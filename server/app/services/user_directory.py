@@ -0,0 +1,128 @@
+"""
+User Directory
+In-memory prefix index over usernames for recipient autocomplete
+
+Usernames are kept in a sorted array (case-insensitive) so a prefix lookup is
+a binary search followed by a short scan, instead of a LIKE query per
+keystroke. The index is loaded once at startup and updated incrementally when
+users are created.
+"""
+
+import bisect
+from app.services.db_service import execute_query
+
+# Sorted case-folded usernames and the matching (user_id, username) entries
+_keys = []
+_entries = []
+
+
+def _key(username):
+    return username.casefold()
+
+
+def load_directory(app):
+    """
+    Build the index from the users table
+
+    Args:
+        app: Flask application instance (an app context must be active)
+    """
+    _keys.clear()
+    _entries.clear()
+
+    # In-memory test databases have no tables
+    if app.config['DATABASE_PATH'] == ':memory:':
+        return
+
+    rows = execute_query("SELECT id, username FROM users", fetch_all=True)
+    rows.sort(key=lambda row: _key(row['username']))
+    _keys.extend(_key(row['username']) for row in rows)
+    _entries.extend((row['id'], row['username']) for row in rows)
+
+    app.logger.info(f"User directory loaded: {len(_keys)} users")
+
+
+def add_user(user_id, username):
+    """
+    Insert a user into the index
+
+    Args:
+        user_id: User's ID
+        username: User's username
+    """
+    key = _key(username)
+    index = bisect.bisect_left(_keys, key)
+    _keys.insert(index, key)
+    _entries.insert(index, (user_id, username))
+
+
+def search(prefix, limit=20):
+    """
+    Find users whose username starts with a prefix (case-insensitive)
+
+    Args:
+        prefix: Username prefix
+        limit: Maximum number of results
+
+    Returns:
+        List of (user_id, username) tuples in username order
+    """
+    key = _key(prefix)
+    if not key:
+        return []
+
+    start = bisect.bisect_left(_keys, key)
+    # Every key with this prefix sorts before prefix + the highest code point
+    end = bisect.bisect_left(_keys, key + '\U0010ffff', start, min(start + limit, len(_keys)))
+    return _entries[start:end]
+
+
+def parse_search(query, limit, max_results):
+    """
+    Validate search input (shared by the REST route and the socket event)
+
+    Args:
+        query: Raw query; anything but a string is treated as empty
+        limit: Raw limit; anything but a positive integer means max_results
+        max_results: Upper bound of the limit
+
+    Returns:
+        Tuple (query, limit)
+    """
+    if not isinstance(query, str):
+        query = ''
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit <= 0:
+        limit = max_results
+    return query, min(limit, max_results)
+
+
+def search_users(prefix, limit=20):
+    """
+    Find users by username prefix
+
+    Socket connections are not linked to users yet, so presence cannot say
+    whether a user is online: 'status' is None (unknown) rather than a
+    guessed 'offline'. Use presence_service.get_user_status once connections
+    carry a user id.
+
+    Args:
+        prefix: Username prefix
+        limit: Maximum number of results
+
+    Returns:
+        List of dicts with 'id', 'username' and 'status' (None)
+    """
+    return [
+        {'id': user_id, 'username': username, 'status': None}
+        for user_id, username in search(prefix, limit)
+    ]
+
+
+def size():
+    """
+    Get the number of indexed users
+
+    Returns:
+        User count
+    """
+    return len(_keys)
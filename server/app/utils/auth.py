@@ -0,0 +1,51 @@
+"""
+Authorization Helpers
+Guards for operational (admin) endpoints
+"""
+
+import hmac
+from functools import wraps
+from datetime import datetime
+from flask import request, jsonify, current_app
+
+# Addresses treated as local when no admin token is configured
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def admin_required(view):
+    """
+    Decorator restricting a route to administrators
+
+    The caller must send the configured ADMIN_TOKEN in the X-Admin-Token
+    header. Without a configured token, admin routes are only reachable in
+    testing, or in debug from the local machine (the development server
+    listens on all interfaces).
+
+    Args:
+        view: Flask view function
+
+    Returns:
+        Wrapped view function
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('ADMIN_TOKEN')
+
+        if token:
+            supplied = request.headers.get('X-Admin-Token', '')
+            allowed = hmac.compare_digest(supplied.encode(), token.encode())
+        else:
+            allowed = current_app.config['TESTING'] or (
+                current_app.config['DEBUG'] and request.remote_addr in LOOPBACK_ADDRESSES
+            )
+
+        if not allowed:
+            return jsonify({
+                'error': 'Forbidden',
+                'message': 'Admin token required',
+                'timestamp': datetime.now().isoformat()
+            }), 403
+
+        return view(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,136 @@
+"""
+Hierarchical Timer Wheel
+Schedules large numbers of coarse-grained timers with O(1) insert and cancel
+
+Level 0 has one slot per tick; each higher level covers `slots` times the
+range of the level below. Timers far in the future sit in a high level and
+cascade down as the wheel turns, so advancing the wheel only touches the
+timers that are due (plus occasional cascades).
+"""
+
+
+class TimerWheel:
+    """Hierarchical timing wheel keyed by arbitrary hashable ids"""
+
+    def __init__(self, tick=1.0, slots=64, levels=4, start=0.0):
+        """
+        Create an empty wheel
+
+        Args:
+            tick: Resolution of the wheel in seconds
+            slots: Slots per level (must be a power of two)
+            levels: Number of levels; range is tick * slots ** levels
+            start: Time corresponding to tick zero
+        """
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.start = start
+        self.current_tick = 0
+
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._wheel = [[{} for _ in range(slots)] for _ in range(levels)]
+        # Structure: {key: (level, slot)} for O(1) cancel
+        self._where = {}
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    def _to_tick(self, when):
+        return int((when - self.start) // self.tick)
+
+    def _place(self, key, deadline):
+        """Put a timer into the level/slot covering its deadline tick"""
+        delta = max(deadline - self.current_tick, 0)
+        level = 0
+        while level < self.levels - 1 and delta >= 1 << (self._bits * (level + 1)):
+            level += 1
+
+        # Clamp timers beyond the wheel's range into the furthest slot;
+        # they are re-placed with their real deadline when that slot cascades
+        max_delta = (1 << (self._bits * (level + 1))) - 1
+        target = self.current_tick + min(delta, max_delta)
+        slot = (target >> (self._bits * level)) & self._mask
+
+        self._wheel[level][slot][key] = deadline
+        self._where[key] = (level, slot)
+
+    def schedule(self, key, when):
+        """
+        Schedule (or reschedule) a timer
+
+        Args:
+            key: Timer id; an existing timer with this id is replaced
+            when: Absolute time at which the timer is due
+        """
+        self.cancel(key)
+        self._place(key, max(self._to_tick(when), self.current_tick + 1))
+
+    def cancel(self, key):
+        """
+        Cancel a timer if it is scheduled
+
+        Args:
+            key: Timer id
+
+        Returns:
+            True if a timer was removed
+        """
+        where = self._where.pop(key, None)
+        if where is None:
+            return False
+        level, slot = where
+        bucket = self._wheel[level][slot]
+        del bucket[key]
+        if not bucket:
+            # An emptied dict keeps its peak capacity; release it
+            self._wheel[level][slot] = {}
+        return True
+
+    def advance(self, now):
+        """
+        Turn the wheel up to the given time
+
+        Args:
+            now: Current time
+
+        Returns:
+            List of timer ids that became due
+        """
+        due = []
+        target = self._to_tick(now)
+
+        while self.current_tick < target:
+            self.current_tick += 1
+            tick = self.current_tick
+
+            # Cascade higher levels whose slot boundary has been reached
+            for level in range(1, self.levels):
+                if tick & ((1 << (self._bits * level)) - 1):
+                    break
+                slot = (tick >> (self._bits * level)) & self._mask
+                bucket = self._wheel[level][slot]
+                if bucket:
+                    self._wheel[level][slot] = {}
+                    for key, deadline in bucket.items():
+                        del self._where[key]
+                        if deadline <= tick:
+                            due.append(key)
+                        else:
+                            self._place(key, deadline)
+
+            bucket = self._wheel[0][tick & self._mask]
+            if bucket:
+                self._wheel[0][tick & self._mask] = {}
+                for key in bucket:
+                    del self._where[key]
+                    due.append(key)
+
+        return due
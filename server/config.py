@@ -36,14 +36,83 @@ class Config:
     SOCKETIO_PING_TIMEOUT = 60
     SOCKETIO_PING_INTERVAL = 25
 
+    # Compression (HTTP long-polling and WebSocket permessage-deflate)
+    SOCKETIO_HTTP_COMPRESSION = os.environ.get('SOCKETIO_HTTP_COMPRESSION', 'true').lower() == 'true'
+    SOCKETIO_WEBSOCKET_COMPRESSION = os.environ.get('SOCKETIO_WEBSOCKET_COMPRESSION', 'true').lower() == 'true'
+    SOCKETIO_COMPRESSION_THRESHOLD = int(os.environ.get('SOCKETIO_COMPRESSION_THRESHOLD', 1024))  # bytes
+    SOCKETIO_COMPRESSION_LEVEL = int(os.environ.get('SOCKETIO_COMPRESSION_LEVEL', 6))  # 0-9
+    SOCKETIO_SERVER_NO_CONTEXT_TAKEOVER = os.environ.get('SOCKETIO_SERVER_NO_CONTEXT_TAKEOVER', 'false').lower() == 'true'
+    SOCKETIO_CLIENT_NO_CONTEXT_TAKEOVER = os.environ.get('SOCKETIO_CLIENT_NO_CONTEXT_TAKEOVER', 'false').lower() == 'true'
+
+    # Message batching
+    MESSAGE_BATCH_MAX_SIZE = 100  # Max messages accepted in one message_batch event
+    OUTBOUND_COALESCE_WINDOW_MS = int(os.environ.get('OUTBOUND_COALESCE_WINDOW_MS', 10))
+    OUTBOUND_COALESCE_MAX_EVENTS = 50  # Flush early once this many events are buffered
+
+    # User search
+    USER_SEARCH_MAX_RESULTS = 20
+
+    # Typing indicators (seconds)
+    TYPING_TIMEOUT = 5  # Typing state expires after this long without a keystroke
+    TYPING_DEBOUNCE = 1  # Repeated keystrokes within this window are ignored
+    TYPING_SWEEP_INTERVAL = 1  # How often stale typing state is swept
+
+    # Presence (seconds)
+    PRESENCE_TICK = 1  # Timer wheel resolution and batch interval
+    PRESENCE_IDLE_AFTER = 60  # Inactivity before a connection is idle
+    PRESENCE_AWAY_AFTER = 300  # Inactivity before a connection is away
+    PRESENCE_OFFLINE_AFTER = 900  # Inactivity before a connection is offline
+    PRESENCE_MAX_WATCHED = 1000  # Connections one client may watch
+
+    # Graceful drain (SIGTERM or POST /api/admin/drain)
+    DRAIN_WAVE_SIZE = int(os.environ.get('DRAIN_WAVE_SIZE', 500))  # clients per wave
+    DRAIN_WAVE_INTERVAL = float(os.environ.get('DRAIN_WAVE_INTERVAL', 1.0))  # seconds
+    # Reconnect hint range (milliseconds) sent to clients
+    DRAIN_RECONNECT_MIN_MS = int(os.environ.get('DRAIN_RECONNECT_MIN_MS', 1000))
+    DRAIN_RECONNECT_MAX_MS = int(os.environ.get('DRAIN_RECONNECT_MAX_MS', 30000))
+
     # Database
     DATABASE_PATH = os.environ.get('DATABASE_PATH', 'chat.db')
 
+    # Message storage engine: 'sqlite' (messages table) or 'log' (append-only segments)
+    MESSAGE_STORE_ENGINE = os.environ.get('MESSAGE_STORE_ENGINE', 'sqlite')
+    MESSAGE_LOG_DIR = os.environ.get('MESSAGE_LOG_DIR', 'message_log')
+    MESSAGE_LOG_SEGMENT_SIZE = int(os.environ.get('MESSAGE_LOG_SEGMENT_SIZE', 64 * 1024 * 1024))  # bytes
+    MESSAGE_LOG_COMPACT_RATIO = 0.5  # Dead-byte share at which a sealed segment is rewritten
+    MESSAGE_LOG_COMPACT_INTERVAL = 60  # seconds; 0 disables background compaction
+    MESSAGE_LOG_MAX_OPEN = 256  # Conversation logs kept open
+
+    # Attachments
+    ATTACHMENTS_DIR = os.environ.get('ATTACHMENTS_DIR', 'attachments')
+    ATTACHMENT_MAX_SIZE = int(os.environ.get('ATTACHMENT_MAX_SIZE', 100 * 1024 * 1024))  # bytes
+    ATTACHMENT_CHUNK_SIZE = int(os.environ.get('ATTACHMENT_CHUNK_SIZE', 1024 * 1024))  # bytes
+    ATTACHMENT_CACHE_MAX_AGE = 86400  # seconds; attachment content never changes
+    # Uploads without a chunk for this long are deleted by the cleanup task
+    ATTACHMENT_UPLOAD_TTL = int(os.environ.get('ATTACHMENT_UPLOAD_TTL', 86400))  # seconds
+    ATTACHMENT_CLEANUP_INTERVAL = 600  # seconds; 0 disables the cleanup task
+    ATTACHMENT_MAX_PENDING_UPLOADS = int(os.environ.get('ATTACHMENT_MAX_PENDING_UPLOADS', 1000))
+    # Let a front-end server (nginx/Apache) send files with X-Sendfile
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
+
     # Session
     SESSION_TYPE = 'filesystem'
     SESSION_PERMANENT = False
     SESSION_USE_SIGNER = True
 
+    # Admin endpoints (X-Admin-Token header); unset disables them outside debug/testing
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+    # Memory introspection
+    MEMORY_TRACEMALLOC_ON_START = os.environ.get('MEMORY_TRACEMALLOC_ON_START', 'false').lower() == 'true'
+    MEMORY_TRACEMALLOC_FRAMES = int(os.environ.get('MEMORY_TRACEMALLOC_FRAMES', 1))
+
+    # Sampling profiler (admin routes)
+    PROFILER_MAX_SECONDS = 60  # Longest sampling run accepted
+    PROFILER_INTERVAL_MS = 10  # Default sampling interval
+
+    # Traffic recording for replay (disabled when unset; .gz paths are compressed)
+    TRAFFIC_RECORD_PATH = os.environ.get('TRAFFIC_RECORD_PATH')
+
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE = os.environ.get('LOG_FILE', 'server.log')
@@ -0,0 +1,110 @@
+"""
+Message Store Benchmark
+Compares insert and history-read throughput of the SQLite and log engines
+
+Usage (from the server directory):
+    python scripts/bench_message_store.py
+    python scripts/bench_message_store.py --messages 50000 --conversations 20 --fsync-every 100
+
+Each engine gets a fresh temporary database/log directory. Inserts are spread
+round-robin over the conversations; history reads fetch random pages of
+--page-size messages, half of them from the newest message and half from a
+random position. SQLite commits (and syncs) every insert, while the log engine
+only writes to the page cache: --fsync-every N flushes the log engine every N
+inserts for a durability-matched comparison.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run(engine, args, rng):
+    """
+    Insert messages, then read history pages
+
+    Returns:
+        Tuple (inserts per second, history pages per second)
+    """
+    conversations = [f'bench-{i}' for i in range(args.conversations)]
+    content = 'x' * args.message_size
+    last_ids = {}
+
+    started = time.perf_counter()
+    for i in range(args.messages):
+        conversation_id = conversations[i % len(conversations)]
+        last_ids[conversation_id] = engine.append(conversation_id, i % 100, content)
+        if args.fsync_every and (i + 1) % args.fsync_every == 0:
+            engine.flush()
+    engine.flush()
+    insert_rate = args.messages / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for i in range(args.reads):
+        conversation_id = rng.choice(conversations)
+        before = None if i % 2 else rng.randint(1, last_ids[conversation_id]) + 1
+        engine.get_history(conversation_id, before, args.page_size)
+    read_rate = args.reads / (time.perf_counter() - started)
+
+    return insert_rate, read_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark message storage engines')
+    parser.add_argument('--messages', type=int, default=20000, help='Messages to insert')
+    parser.add_argument('--conversations', type=int, default=10, help='Conversations to spread them over')
+    parser.add_argument('--message-size', type=int, default=120, help='Message length in characters')
+    parser.add_argument('--reads', type=int, default=2000, help='History pages to read')
+    parser.add_argument('--page-size', type=int, default=50, help='Messages per history page')
+    parser.add_argument('--fsync-every', type=int, default=0,
+                        help='Flush the log engine every N inserts (0 = only at the end)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_message_store_')
+    os.environ.update({
+        'DATABASE_PATH': os.path.join(workdir, 'bench.db'),
+        'MESSAGE_LOG_DIR': os.path.join(workdir, 'message_log'),
+        'TRAFFIC_RECORD_PATH': '',
+    })
+
+    from app import create_app
+    from app.services.message_store import SQLiteEngine, create_engine
+
+    app = create_app('development')
+    app.logger.setLevel('WARNING')
+
+    results = {}
+    try:
+        with app.app_context():
+            results['sqlite'] = run(SQLiteEngine(), args, random.Random(args.seed))
+
+        engine = create_engine({**app.config, 'MESSAGE_STORE_ENGINE': 'log'})
+        try:
+            results['log'] = run(engine, args, random.Random(args.seed))
+        finally:
+            engine.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.messages} messages over {args.conversations} conversations, "
+          f"{args.reads} history pages of {args.page_size}")
+    print(f"{'engine':<10}{'inserts/s':>14}{'pages/s':>14}")
+    for name, (insert_rate, read_rate) in results.items():
+        print(f"{name:<10}{insert_rate:>14.0f}{read_rate:>14.0f}")
+
+    sqlite_insert, sqlite_read = results['sqlite']
+    log_insert, log_read = results['log']
+    print(f"log vs sqlite: inserts x{log_insert / sqlite_insert:.1f}, "
+          f"history reads x{log_read / sqlite_read:.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Traffic Replay Harness
+Replays a recorded traffic log against create_app('testing') and reports
+per-event latency and throughput
+
+Usage (from the server directory):
+    python scripts/replay_traffic.py traffic.log.gz --speed 10 --output new.json
+    python scripts/replay_traffic.py traffic.log.gz --speed 0 --compare old.json
+
+Record a log by starting the server with TRAFFIC_RECORD_PATH set. --speed is a
+multiplier of the recorded pace (1 = real time); 0 replays as fast as
+possible. Run the same log against two builds and pass the first report to
+--compare to see the latency/throughput difference; --max-regression makes the
+run fail when p95 latency or throughput regresses by more than that percentage.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Never record while replaying
+os.environ.pop('TRAFFIC_RECORD_PATH', None)
+
+
+def load_log(path):
+    """
+    Read recorded events as (offset, client_number, event, args) tuples
+
+    A log cut short by a crash (gzip stream without its end marker, torn last
+    line) is read up to the last complete event.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if path.endswith('.gz'):
+        # Unlike gzip.open, a decompressor returns whatever it could decode
+        # from a stream that ends abruptly
+        data = b''
+        while raw:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                data += decompressor.decompress(raw)
+            except zlib.error:
+                break
+            raw = decompressor.unused_data
+        raw = data
+
+    lines = raw.decode('utf-8', errors='replace').split('\n')
+    if lines[-1].strip():
+        print(f'Skipping truncated last line of {path}')
+    return [tuple(json.loads(line)) for line in lines[:-1] if line.strip()]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies):
+    """Build latency statistics (milliseconds) for one event type"""
+    values = sorted(latencies)
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values), 4),
+        'p50_ms': round(percentile(values, 50), 4),
+        'p95_ms': round(percentile(values, 95), 4),
+        'p99_ms': round(percentile(values, 99), 4),
+        'max_ms': round(values[-1], 4),
+    }
+
+
+def replay(events, speed):
+    """
+    Feed recorded events into a fresh testing app
+
+    Returns:
+        Report dict with per-event latency statistics and throughput
+    """
+    from flask_socketio.test_client import SocketIOTestClient
+    from app import create_app, socketio
+
+    app = create_app('testing')
+    clients = {}
+    latencies = {}
+
+    def close(client):
+        client.disconnect()
+        SocketIOTestClient.clients.pop(client.eio_sid, None)
+        socketio.server.environ.pop(client.eio_sid, None)
+
+    started = time.perf_counter()
+    for offset, client_number, event, args in events:
+        if speed:
+            delay = started + offset / speed - time.perf_counter()
+            if delay > 0:
+                socketio.sleep(delay)
+
+        client = clients.get(client_number)
+        t0 = time.perf_counter()
+        if event == 'connect':
+            if client is not None:
+                close(client)
+            clients[client_number] = socketio.test_client(app, auth=args[0] if args else None)
+        elif event == 'disconnect':
+            if client is None:
+                continue
+            close(clients.pop(client_number))
+        else:
+            if client is None:
+                # Recording started while this client was already connected
+                client = clients[client_number] = socketio.test_client(app)
+                t0 = time.perf_counter()
+            client.emit(event, *args)
+        latencies.setdefault(event, []).append((time.perf_counter() - t0) * 1000)
+
+        if client_number in clients:
+            # Discard responses so the test client queues stay small
+            clients[client_number].get_received()
+
+    elapsed = time.perf_counter() - started
+    for client in list(clients.values()):
+        close(client)
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        'events': total,
+        'elapsed_s': round(elapsed, 4),
+        'throughput_eps': round(total / elapsed, 2) if elapsed else None,
+        'speed': speed,
+        'per_event': {event: summarize(values) for event, values in sorted(latencies.items())},
+    }
+
+
+def pct_change(new, old):
+    """Percentage change from old to new"""
+    return round((new - old) / old * 100, 2) if old else None
+
+
+def compare(report, baseline):
+    """
+    Compare a report with a baseline report
+
+    Returns:
+        Tuple (diff dict, worst p95 regression %, throughput change %)
+    """
+    diff = {}
+    worst = 0.0
+    for event, stats in report['per_event'].items():
+        old = baseline['per_event'].get(event)
+        if old is None:
+            continue
+        change = pct_change(stats['p95_ms'], old['p95_ms'])
+        diff[event] = {
+            'p50_change_pct': pct_change(stats['p50_ms'], old['p50_ms']),
+            'p95_change_pct': change,
+            'mean_change_pct': pct_change(stats['mean_ms'], old['mean_ms']),
+        }
+        if change is not None:
+            worst = max(worst, change)
+    throughput = pct_change(report['throughput_eps'], baseline['throughput_eps'])
+    return diff, worst, throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded SocketIO traffic')
+    parser.add_argument('log', help='Traffic log written by the recorder')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Replay speed multiplier (0 = as fast as possible)')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--compare', help='Baseline JSON report to diff against')
+    parser.add_argument('--max-regression', type=float,
+                        help='Fail if p95 latency or throughput regresses by more than this %%')
+    args = parser.parse_args()
+
+    events = load_log(args.log)
+    if not events:
+        print('Traffic log is empty')
+        return 1
+
+    report = replay(events, args.speed)
+
+    print(f"{report['events']} events in {report['elapsed_s']}s "
+          f"({report['throughput_eps']} events/s)")
+    print(f"{'event':<24}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for event, stats in report['per_event'].items():
+        print(f"{event:<24}{stats['count']:>8}{stats['mean_ms']:>10.3f}"
+              f"{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    diff, worst, throughput = compare(report, baseline)
+
+    print()
+    print(f"throughput change: {throughput}%")
+    print(f"{'event':<24}{'mean %':>10}{'p50 %':>10}{'p95 %':>10}")
+    for event, changes in diff.items():
+        print(f"{event:<24}{str(changes['mean_change_pct']):>10}"
+              f"{str(changes['p50_change_pct']):>10}{str(changes['p95_change_pct']):>10}")
+
+    if args.max_regression is not None:
+        if worst > args.max_regression or (throughput is not None and -throughput > args.max_regression):
+            print(f"FAIL: regression exceeds {args.max_regression}%")
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Memory Soak Test
+Connects and disconnects clients in cycles and fails if memory keeps growing
+
+Usage (from the server directory):
+    python scripts/soak_memory.py                       # in-process, tracemalloc
+    python scripts/soak_memory.py --url http://localhost:5000 --token TOKEN
+
+In-process mode drives the handlers through the Flask-SocketIO test client on
+an app built with create_app('testing') and measures traced Python memory.
+Live mode opens real Engine.IO long-polling sessions against a running server
+and measures RSS through /api/admin/memory.
+
+Exits with status 1 if memory keeps growing after the warm-up cycles: the
+least-squares slope of the post-warm-up samples, divided by --clients, must
+stay under a per-connection budget (bytes per connection per cycle). A slope
+catches slow linear leaks that a flat byte tolerance lets through, and the
+per-connection budget scales with --clients and --cycles.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def exercise_in_process(socketio, app, clients_per_cycle):
+    """Run one connect/activity/disconnect cycle through the test client"""
+    from flask_socketio.test_client import SocketIOTestClient
+
+    clients = [socketio.test_client(app, query_string='coalesce=1' if i % 2 else '')
+               for i in range(clients_per_cycle)]
+    for i, client in enumerate(clients):
+        client.emit('join_conversation', {'conversation_id': f'soak-{i % 5}'})
+        client.emit('typing', {'conversation_id': f'soak-{i % 5}'})
+        client.emit('message', {'content': 'soak message'})
+        client.emit('message_batch', [{'content': 'a'}, {'content': 'b'}])
+        client.emit('get_status')
+
+    # Let coalescer flushes and the presence/typing background tasks run
+    socketio.sleep(0.1)
+
+    for client in clients:
+        client.disconnect()
+        # The test client never closes the simulated Engine.IO session: it
+        # stays in a class-level registry and in the server's environ map.
+        # Drop both so they do not count as a server-side leak
+        SocketIOTestClient.clients.pop(client.eio_sid, None)
+        socketio.server.environ.pop(client.eio_sid, None)
+
+    socketio.sleep(0.1)
+
+
+def measure_in_process():
+    """Measure traced Python memory after a full collection"""
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def polling_request(url, sid=None, body=None):
+    """Send one Engine.IO long-polling request and return the response body"""
+    query = 'EIO=4&transport=polling' + (f'&sid={sid}' if sid else '')
+    request = urllib.request.Request(
+        f'{url}/socket.io/?{query}',
+        data=body.encode() if body is not None else None,
+        method='POST' if body is not None else 'GET',
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.read().decode()
+
+
+def exercise_live(url, clients_per_cycle):
+    """Run one connect/activity/disconnect cycle against a running server"""
+    sids = []
+    for _ in range(clients_per_cycle):
+        handshake = polling_request(url)
+        sid = json.loads(handshake[1:])['sid']
+        polling_request(url, sid, '40')
+        polling_request(url, sid)
+        sids.append(sid)
+
+    for sid in sids:
+        polling_request(url, sid, '42["message",{"content":"soak message"}]')
+        polling_request(url, sid, '42["get_status"]')
+
+    for sid in sids:
+        polling_request(url, sid, '41\x1e1')
+
+
+def measure_live(url, token):
+    """Read the server RSS from the admin memory endpoint"""
+    request = urllib.request.Request(f'{url}/api/admin/memory')
+    if token:
+        request.add_header('X-Admin-Token', token)
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())['rss_bytes']
+
+
+def slope(samples):
+    """
+    Least-squares slope of samples taken once per cycle
+
+    Args:
+        samples: Memory measurements in bytes
+
+    Returns:
+        Growth in bytes per cycle
+    """
+    n = len(samples)
+    mean_x = (n - 1) / 2
+    mean_y = sum(samples) / n
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(samples))
+    variance = sum((x - mean_x) ** 2 for x in range(n))
+    return covariance / variance
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Connect/disconnect memory soak test')
+    parser.add_argument('--cycles', type=int, default=30, help='Number of cycles')
+    parser.add_argument('--clients', type=int, default=50, help='Clients per cycle')
+    parser.add_argument('--warmup', type=int, default=5, help='Cycles ignored before measuring')
+    parser.add_argument('--budget', type=float,
+                        help='Allowed growth in bytes per connection per cycle after warm-up '
+                             '(default 8 traced, 512 RSS)')
+    parser.add_argument('--url', help='Run against a live server instead of in-process')
+    parser.add_argument('--token', default=os.environ.get('ADMIN_TOKEN'),
+                        help='Admin token for /api/admin/memory (live mode)')
+    args = parser.parse_args()
+
+    if args.url:
+        url = args.url.rstrip('/')
+        run_cycle = lambda: exercise_live(url, args.clients)
+        measure = lambda: measure_live(url, args.token)
+        unit = 'RSS'
+        budget = args.budget if args.budget is not None else 512
+    else:
+        from app import create_app, socketio
+        app = create_app('testing')
+        app.config['PRESENCE_TICK'] = 0.05
+        app.config['TYPING_SWEEP_INTERVAL'] = 0.05
+        tracemalloc.start()
+        run_cycle = lambda: exercise_in_process(socketio, app, args.clients)
+        measure = measure_in_process
+        unit = 'traced'
+        budget = args.budget if args.budget is not None else 8
+
+    samples = []
+    for cycle in range(1, args.cycles + 1):
+        run_cycle()
+        samples.append(measure())
+        print(f"cycle {cycle:4d}: {unit} {samples[-1] / 1024:10.1f} KiB")
+
+    measured = samples[args.warmup:]
+    if len(measured) < 3:
+        print('Not enough cycles after warm-up to judge growth')
+        return 1
+
+    per_cycle = slope(measured)
+    per_connection = per_cycle / args.clients
+    print(f"growth after warm-up: {per_cycle:.0f} B/cycle, "
+          f"{per_connection:.1f} B per connection per cycle (budget {budget:g})")
+
+    if per_connection > budget:
+        print('FAIL: memory keeps growing across connect/disconnect cycles')
+        return 1
+
+    print('PASS')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())